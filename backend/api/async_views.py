@@ -0,0 +1,61 @@
+import asyncio
+import contextvars
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.urls import URLPattern
+
+_executor = ThreadPoolExecutor(
+    max_workers=settings.ASYNC_DB_WORKERS,
+    thread_name_prefix='async-db',
+)
+
+
+def _run(view, request, *args, **kwargs):
+    close_old_connections()
+    try:
+        response = view(request, *args, **kwargs)
+        if hasattr(response, 'render'):
+            response.render()
+        return response
+    finally:
+        close_old_connections()
+
+
+def pooled(view):
+    """Асинхронная обёртка синхронного view.
+
+    View и отрисовка ответа выполняются в ограниченном пуле потоков
+    ASYNC_DB_WORKERS, поэтому медленный запрос к базе не занимает
+    цикл событий, а число одновременных соединений с базой не
+    превышает размера пула. Соединения потока закрываются по
+    правилам CONN_MAX_AGE, как после обычного запроса."""
+
+    @functools.wraps(view)
+    async def async_view(request, *args, **kwargs):
+        context = contextvars.copy_context()
+        return await asyncio.get_running_loop().run_in_executor(
+            _executor,
+            functools.partial(
+                context.run, _run, view, request, *args, **kwargs,
+            ),
+        )
+
+    return async_view
+
+
+def async_routes(urlpatterns, names):
+    """Маршруты router.urls, где view с именами из names асинхронные."""
+    return [
+        URLPattern(
+            pattern.pattern,
+            pooled(pattern.callback),
+            pattern.default_args,
+            pattern.name,
+        )
+        if isinstance(pattern, URLPattern) and pattern.name in names
+        else pattern
+        for pattern in urlpatterns
+    ]
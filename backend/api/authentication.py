@@ -0,0 +1,57 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import router
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.permissions import SAFE_METHODS
+
+User = get_user_model()
+
+
+def get_token_cache_key(key):
+    return f'auth_token:{key}'
+
+
+def invalidate_tokens(*keys):
+    cache.delete_many([get_token_cache_key(key) for key in keys])
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication с кэшированием id и активности пользователя.
+
+    Кэш используется только для безопасных методов и только с общим
+    кэшем (CACHE_SHARED): иначе отозванный токен продолжал бы работать
+    в других воркерах. Пользователь строится без обращения к базе,
+    остальные поля загружаются при первом обращении к ним. Записи
+    сбрасываются при выходе, смене пароля и любом сохранении
+    пользователя (api/signals.py)."""
+
+    def authenticate(self, request):
+        self.safe = request.method in SAFE_METHODS
+        return super().authenticate(request)
+
+    def authenticate_credentials(self, key):
+        if not (self.safe and settings.CACHE_SHARED):
+            return super().authenticate_credentials(key)
+        cache_key = get_token_cache_key(key)
+        cached = cache.get(cache_key)
+        if cached is None:
+            user, token = super().authenticate_credentials(key)
+            cache.set(
+                cache_key,
+                (user.pk, user.is_active),
+                settings.AUTH_TOKEN_CACHE_TIMEOUT,
+            )
+            return user, token
+        user_id, is_active = cached
+        if not is_active:
+            raise exceptions.AuthenticationFailed(
+                _('User inactive or deleted.')
+            )
+        user = User.from_db(
+            router.db_for_read(User), ['id', 'is_active'], cached,
+        )
+        return user, Token(key=key, user=user)
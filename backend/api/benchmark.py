@@ -0,0 +1,249 @@
+"""Замер API для benchmark_api и tests/test_benchmark.py.
+
+Для каждого эндпоинта считаются SQL-запросы на холодном кэше (кэш
+очищен перед запросом) и наибольшее их число на прогретом, а также
+задержки p50/p95. Задержки хранятся в долях эталонной нагрузки
+(calibrate), измеренной на той же машине, поэтому базовый уровень
+можно сравнивать между машинами разной скорости.
+"""
+import io
+import json
+import statistics
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from recipes.models import Recipe, Tag
+from users.models import User
+
+DEFAULT_BASELINE = Path(settings.BASE_DIR) / 'benchmarks' / 'baseline.json'
+DEFAULT_USERS = 200
+DEFAULT_RECIPES = 2000
+CALIBRATION_REPEAT = 10
+# Допуск p95 сверх доли от базы, в долях эталонной нагрузки: у быстрых
+# эндпоинтов шум планировщика сравним с самой задержкой.
+LATENCY_NOISE = 0.1
+
+
+class BenchmarkError(Exception):
+    """Эндпоинт ответил ошибкой во время замера."""
+
+
+def generate_data(users=DEFAULT_USERS, recipes=DEFAULT_RECIPES, seed=0):
+    call_command(
+        'generate_data',
+        users=users,
+        recipes=recipes,
+        seed=seed,
+        stdout=io.StringIO(),
+    )
+
+
+def get_cases():
+    """Эндпоинты из api/urls.py: (название, клиент, [(метод, адрес)])."""
+    user = User.objects.filter(follower__isnull=False).first()
+    recipe_id = Recipe.objects.values_list('id', flat=True).first()
+    free_recipe = Recipe.objects.exclude(
+        in_favorite__user=user,
+    ).exclude(shopping_cart__user=user).values_list(
+        'id', flat=True,
+    ).first()
+    tag = Tag.objects.values_list('slug', flat=True).first()
+    client = APIClient()
+    token, _ = Token.objects.get_or_create(user=user)
+    client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+    anonymous = APIClient()
+    return [
+        ('recipes_list_anonymous', anonymous, [
+            ('get', '/api/recipes/?limit=20'),
+        ]),
+        ('recipes_list', client, [
+            ('get', '/api/recipes/?limit=20'),
+        ]),
+        ('recipes_list_cursor', client, [
+            ('get', '/api/recipes/?limit=20&cursor='),
+        ]),
+        ('recipes_list_filtered', client, [
+            ('get', f'/api/recipes/?limit=20&tags={tag}&is_favorited=1'),
+        ]),
+        ('recipes_search', client, [
+            ('get', '/api/recipes/?limit=20&search=суп с грибами'),
+        ]),
+        ('recipe_detail', client, [
+            ('get', f'/api/recipes/{recipe_id}/'),
+        ]),
+        ('recipes_feed', client, [
+            ('get', '/api/recipes/feed/?limit=20'),
+        ]),
+        ('subscriptions', client, [
+            ('get', '/api/users/subscriptions/?limit=10&recipes_limit=3'),
+        ]),
+        ('ingredients_autocomplete', anonymous, [
+            ('get', '/api/ingredients/?name=со'),
+        ]),
+        ('tags', anonymous, [('get', '/api/tags/')]),
+        ('favorite_toggle', client, [
+            ('post', f'/api/recipes/{free_recipe}/favorite/'),
+            ('delete', f'/api/recipes/{free_recipe}/favorite/'),
+        ]),
+        ('shopping_cart_toggle', client, [
+            ('post', f'/api/recipes/{free_recipe}/shopping_cart/'),
+            ('delete', f'/api/recipes/{free_recipe}/shopping_cart/'),
+        ]),
+        ('download_shopping_cart', client, [
+            ('get', '/api/recipes/download_shopping_cart/'),
+        ]),
+    ]
+
+
+def run_case(client, requests):
+    """Число SQL-запросов и длительность в мс."""
+    with CaptureQueriesContext(connection) as context:
+        started = time.perf_counter()
+        for method, url in requests:
+            response = getattr(client, method)(url)
+            if response.status_code >= 400:
+                raise BenchmarkError(
+                    f'{method.upper()} {url}: {response.status_code}'
+                )
+            if response.streaming:
+                b''.join(response.streaming_content)
+        elapsed = time.perf_counter() - started
+    return len(context.captured_queries), elapsed * 1000
+
+
+def calibrate(repeat=CALIBRATION_REPEAT):
+    """Время эталонной нагрузки в мс: сериализация JSON и простые
+    запросы к базе, как в типичном запросе к API. Берётся минимум:
+    он меньше всего зависит от фоновой нагрузки на машину."""
+    rows = [
+        {'id': number, 'name': f'Рецепт {number}', 'tags': [1, 2, 3]}
+        for number in range(2000)
+    ]
+    timings = []
+    for _ in range(repeat + 1):
+        started = time.perf_counter()
+        json.loads(json.dumps(rows))
+        with connection.cursor() as cursor:
+            for _ in range(50):
+                cursor.execute('SELECT 1')
+                cursor.fetchone()
+        timings.append((time.perf_counter() - started) * 1000)
+    return min(timings[1:])
+
+
+def measure(repeat):
+    """Замер всех эндпоинтов на уже наполненной базе.
+
+    Эталонная нагрузка замеряется перед каждым эндпоинтом: скорость
+    виртуальной машины меняется за время замера."""
+    units = []
+    cases = {}
+    for name, client, requests in get_cases():
+        unit = calibrate()
+        units.append(unit)
+        cache.clear()
+        queries_cold, _ = run_case(client, requests)
+        queries = []
+        latencies = []
+        for _ in range(repeat):
+            count, elapsed = run_case(client, requests)
+            queries.append(count)
+            latencies.append(elapsed)
+        latencies.sort()
+        p50 = statistics.median(latencies)
+        p95 = latencies[int(0.95 * (len(latencies) - 1))]
+        cases[name] = {
+            'queries_cold': queries_cold,
+            'queries': max(queries),
+            'p50': round(p50 / unit, 3),
+            'p95': round(p95 / unit, 3),
+            'p50_ms': round(p50, 2),
+            'p95_ms': round(p95, 2),
+        }
+    return {
+        'calibration_ms': round(statistics.median(units), 3),
+        'vendor': connection.vendor,
+        'cases': cases,
+    }
+
+
+def to_baseline(results):
+    """Базовый уровень без абсолютных задержек этой машины."""
+    return {
+        'vendor': results['vendor'],
+        'cases': {
+            name: {
+                key: value for key, value in result.items()
+                if not key.endswith('_ms')
+            }
+            for name, result in results['cases'].items()
+        },
+    }
+
+
+def load_baseline(path=DEFAULT_BASELINE):
+    path = Path(path)
+    return json.loads(path.read_text()) if path.exists() else {'cases': {}}
+
+
+def save_baseline(results, path=DEFAULT_BASELINE):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(
+        json.dumps(to_baseline(results), indent=2, sort_keys=True) + '\n'
+    )
+
+
+def compare(results, baseline, query_threshold=0, latency_threshold=0.5):
+    """Строки отчёта и список регрессий относительно baseline.
+
+    Задержки сравниваются, только если базовый уровень снят на той же
+    СУБД: доля записи в эталонной нагрузке у SQLite и PostgreSQL разная.
+    """
+    lines = [
+        f'Эталонная нагрузка: {results["calibration_ms"]:.2f} мс '
+        f'(p50/p95 ниже - в её долях)',
+    ]
+    same_vendor = baseline.get('vendor') == results['vendor']
+    if baseline['cases'] and not same_vendor:
+        lines.append(
+            f'Базовый уровень снят на {baseline.get("vendor")}, '
+            f'замер на {results["vendor"]}: задержки не сравниваются.'
+        )
+    regressions = []
+    for name, result in results['cases'].items():
+        base = baseline['cases'].get(name)
+        line = (
+            f'{name:<28} запросов {result["queries_cold"]:>3}/'
+            f'{result["queries"]:<3} '
+            f'p50 {result["p50"]:>7.3f} ({result["p50_ms"]:.2f} мс) '
+            f'p95 {result["p95"]:>7.3f} ({result["p95_ms"]:.2f} мс)'
+        )
+        if base:
+            line += (
+                f'  (база: {base["queries_cold"]}/{base["queries"]}, '
+                f'{base["p50"]:.3f}, {base["p95"]:.3f})'
+            )
+            for key in ('queries_cold', 'queries'):
+                limit = base[key] + query_threshold
+                if result[key] > limit:
+                    regressions.append(
+                        f'{name}: {key} {result[key]} > {limit}'
+                    )
+            latency_limit = (
+                base['p95'] * (1 + latency_threshold) + LATENCY_NOISE
+            )
+            if same_vendor and result['p95'] > latency_limit:
+                regressions.append(
+                    f'{name}: p95 {result["p95"]} > {latency_limit:.3f}'
+                )
+        lines.append(line)
+    return lines, regressions
@@ -1,13 +1,27 @@
 import django_filters as filters
+from django import forms
 
+from recipes.cache import get_tag_ids_by_slug
 from recipes.models import Ingredient, Recipe
+from recipes.search import search_recipes
+
+
+class TagSlugsField(forms.MultipleChoiceField):
+    """Список slug тегов; неизвестные slug отсекаются в фильтре."""
+
+    def valid_value(self, value):
+        return True
+
+
+class TagSlugsFilter(filters.MultipleChoiceFilter):
+    field_class = TagSlugsField
 
 
 class RecipeFilter(filters.FilterSet):
     """Класс фильтрации рецептов."""
 
-    tags = filters.AllValuesMultipleFilter(
-        field_name='tags__slug',
+    tags = TagSlugsFilter(
+        method='get_tags',
         label='Tags',
     )
     is_favorited = filters.NumberFilter(
@@ -18,6 +32,10 @@ class RecipeFilter(filters.FilterSet):
         method='get_shopping',
         label='Is in shopping list',
     )
+    search = filters.CharFilter(
+        method='get_search',
+        label='Search',
+    )
 
     class Meta:
         model = Recipe
@@ -26,8 +44,22 @@ class RecipeFilter(filters.FilterSet):
             'author',
             'tags',
             'is_in_shopping_cart',
+            'search',
+        )
+
+    def get_tags(self, queryset, name, slugs):
+        """Метод получения рецептов хотя бы с одним из тегов."""
+        if not slugs:
+            return queryset
+        tag_ids = get_tag_ids_by_slug()
+        return queryset.with_any_tag(
+            [tag_ids[slug] for slug in slugs if slug in tag_ids]
         )
 
+    def get_search(self, queryset, name, value):
+        """Метод полнотекстового поиска по названию и описанию."""
+        return search_recipes(queryset, value)
+
     def get_favorite(self, queryset, name, item_value):
         """Метод получения рецептов в избранном."""
         if item_value and not self.request.user.is_anonymous:
@@ -0,0 +1,97 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+
+from api import benchmark
+
+BENCHMARK_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'benchmark',
+    }
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Замер числа SQL-запросов на холодном и прогретом кэше и задержек '
+        'p50/p95 эндпоинтов API на тестовой базе и сравнение с '
+        'сохранённым базовым уровнем.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--users', type=int, default=benchmark.DEFAULT_USERS,
+        )
+        parser.add_argument(
+            '--recipes', type=int, default=benchmark.DEFAULT_RECIPES,
+        )
+        parser.add_argument('--repeat', type=int, default=30)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--baseline',
+            default=str(benchmark.DEFAULT_BASELINE),
+            help='Файл базового уровня.',
+        )
+        parser.add_argument(
+            '--update-baseline',
+            action='store_true',
+            help='Записать результаты как новый базовый уровень.',
+        )
+        parser.add_argument(
+            '--latency-threshold',
+            type=float,
+            default=0.5,
+            help='Допустимый рост p95, доля от базового уровня.',
+        )
+        parser.add_argument(
+            '--query-threshold',
+            type=int,
+            default=0,
+            help='Допустимый рост числа запросов.',
+        )
+
+    def measure(self, options):
+        benchmark.generate_data(
+            options['users'], options['recipes'], options['seed'],
+        )
+        try:
+            return benchmark.measure(options['repeat'])
+        except benchmark.BenchmarkError as error:
+            raise CommandError(error)
+
+    def handle(self, *args, **options):
+        old_name = connection.settings_dict['NAME']
+        # Все запросы идут в тестовую копию основной базы, где их и
+        # считает CaptureQueriesContext, даже если настроена реплика.
+        # Замер идёт в одном процессе, поэтому кэш в его памяти
+        # работает как общий кэш нескольких воркеров.
+        with override_settings(
+            CACHES=BENCHMARK_CACHES,
+            CACHE_SHARED=True,
+            DATABASE_ROUTERS=[],
+            DEBUG=False,
+        ):
+            connection.creation.create_test_db(verbosity=0, autoclobber=True)
+            try:
+                results = self.measure(options)
+            finally:
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+        if options['update_baseline']:
+            benchmark.save_baseline(results, options['baseline'])
+            lines, _ = benchmark.compare(results, {'cases': {}})
+            self.stdout.write('\n'.join(lines))
+            self.stdout.write(self.style.SUCCESS(
+                f'Базовый уровень: {options["baseline"]}'
+            ))
+            return
+        lines, regressions = benchmark.compare(
+            results,
+            benchmark.load_baseline(options['baseline']),
+            options['query_threshold'],
+            options['latency_threshold'],
+        )
+        self.stdout.write('\n'.join(lines))
+        if regressions:
+            raise CommandError('Регрессия:\n' + '\n'.join(regressions))
+        self.stdout.write(self.style.SUCCESS('Регрессий нет.'))
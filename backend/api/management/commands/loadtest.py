@@ -0,0 +1,162 @@
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+import requests
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from recipes.models import Recipe
+
+WORKER_CLASSES = ('sync', 'gthread', 'uvicorn')
+READY_TIMEOUT = 30
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнение пропускной способности моделей воркеров: запуск '
+        'gunicorn с gunicorn.conf.py для каждого WORKER_CLASS и нагрузка '
+        'конкурентными клиентами на эндпоинты чтения.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--modes',
+            nargs='+',
+            choices=WORKER_CLASSES,
+            default=list(WORKER_CLASSES),
+        )
+        parser.add_argument('--workers', type=int, default=2)
+        parser.add_argument('--concurrency', type=int, default=32)
+        parser.add_argument(
+            '--duration',
+            type=float,
+            default=10,
+            help='Длительность нагрузки на режим, секунд.',
+        )
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument(
+            '--path',
+            action='append',
+            dest='paths',
+            help='Адрес для нагрузки, можно указать несколько раз.',
+        )
+        parser.add_argument(
+            '--token',
+            help='Токен авторизации для запросов.',
+        )
+
+    def get_paths(self, options):
+        if options['paths']:
+            return options['paths']
+        recipe_id = Recipe.objects.values_list('id', flat=True).last()
+        paths = [
+            '/api/recipes/?limit=20',
+            f'/api/recipes/{recipe_id}/',
+            '/api/tags/',
+            '/api/ingredients/?name=со',
+        ]
+        if options['token']:
+            paths.append('/api/recipes/download_shopping_cart/')
+        return paths
+
+    def start_server(self, mode, options):
+        """Запуск gunicorn; возвращает процесс и время до готовности."""
+        process = subprocess.Popen(
+            [
+                sys.executable, '-m', 'gunicorn',
+                '--config', 'gunicorn.conf.py',
+                '--log-level', 'warning',
+            ],
+            cwd=settings.BASE_DIR,
+            env={
+                **os.environ,
+                'WORKER_CLASS': mode,
+                'GUNICORN_WORKERS': str(options['workers']),
+                'GUNICORN_BIND': f'127.0.0.1:{options["port"]}',
+            },
+        )
+        started = time.monotonic()
+        deadline = started + READY_TIMEOUT
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise CommandError(f'{mode}: сервер завершился при запуске.')
+            try:
+                response = requests.get(
+                    f'http://127.0.0.1:{options["port"]}/api/ready/',
+                    timeout=READY_TIMEOUT,
+                )
+                if response.status_code == 200:
+                    return process, time.monotonic() - started
+            except requests.RequestException:
+                pass
+            time.sleep(0.2)
+        process.terminate()
+        process.wait()
+        raise CommandError(f'{mode}: сервер не запустился.')
+
+    def run_load(self, base_url, paths, options):
+        headers = {}
+        if options['token']:
+            headers['Authorization'] = f'Token {options["token"]}'
+        deadline = time.monotonic() + options['duration']
+        latencies = []
+        errors = []
+
+        def client(offset):
+            session = requests.Session()
+            session.headers.update(headers)
+            number = offset
+            while time.monotonic() < deadline:
+                started = time.perf_counter()
+                try:
+                    response = session.get(
+                        base_url + paths[number % len(paths)], timeout=30,
+                    )
+                    ok = response.status_code < 400
+                except requests.RequestException:
+                    ok = False
+                elapsed = time.perf_counter() - started
+                (latencies if ok else errors).append(elapsed)
+                number += 1
+
+        threads = [
+            threading.Thread(target=client, args=(offset,))
+            for offset in range(options['concurrency'])
+        ]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        latencies.sort()
+        return {
+            'rps': len(latencies) / elapsed,
+            'p50': statistics.median(latencies) * 1000 if latencies else 0,
+            'p95': (
+                latencies[int(0.95 * (len(latencies) - 1))] * 1000
+                if latencies else 0
+            ),
+            'errors': len(errors),
+        }
+
+    def handle(self, *args, **options):
+        paths = self.get_paths(options)
+        base_url = f'http://127.0.0.1:{options["port"]}'
+        for mode in options['modes']:
+            process, startup = self.start_server(mode, options)
+            try:
+                result = self.run_load(base_url, paths, options)
+            finally:
+                process.terminate()
+                process.wait()
+            self.stdout.write(
+                f'{mode}: готов за {startup:.1f} с, '
+                f'{result["rps"]:.1f} запросов/с, '
+                f'p50 {result["p50"]:.1f} мс, p95 {result["p95"]:.1f} мс, '
+                f'ошибок {result["errors"]}'
+            )
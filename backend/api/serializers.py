@@ -1,24 +1,46 @@
 from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Manager
 from djoser.serializers import UserCreateSerializer, UserSerializer
 from drf_extra_fields.fields import Base64ImageField
 from rest_framework import status
 from rest_framework.serializers import (
     IntegerField,
+    ListField,
+    ListSerializer,
     ModelSerializer,
+    Serializer,
     PrimaryKeyRelatedField,
     SerializerMethodField,
     SlugRelatedField,
     ValidationError,
 )
 
+from foodgram.db_router import primary_reads, replica_reads
+from recipes.cache import (
+    FAVORITES,
+    FOLLOWING,
+    SHOPPING_CART,
+    USER_FLAGS,
+    get_author_payload_keys,
+    get_recipe_payload_keys,
+    get_user_flags,
+)
+from recipes.images import get_variant_urls
 from recipes.models import (
     Ingredient,
     Recipe,
     RecipeIngredient,
+    RecipeTag,
     ShoppingList,
     Tag,
+    get_tags_mask,
+    prefetch_full_info,
 )
+from recipes.shopping_cart import add_cart_totals, subtract_cart_totals
+from recipes.utils import get_recipes_limit
 from users.models import Follow
 
 User = get_user_model()
@@ -32,7 +54,20 @@ class UserRegistrationSerializer(UserCreateSerializer):
         fields = ('email', 'username', 'first_name', 'last_name', 'password')
 
 
-class CustomUserSerializer(UserSerializer):
+class UserFlagsMixin:
+    """Доступ к закэшированным избранному, корзине и подпискам
+    текущего пользователя, общий для всех вложенных сериализаторов."""
+
+    def get_user_flags(self):
+        request = self.context.get('request')
+        if not request or request.user.is_anonymous:
+            return None
+        if 'user_flags' not in self.context:
+            self.context['user_flags'] = get_user_flags(request.user.id)
+        return self.context['user_flags']
+
+
+class CustomUserSerializer(UserFlagsMixin, UserSerializer):
     """Сериализатор пользователя."""
 
     is_subscribed = SerializerMethodField(read_only=True)
@@ -49,13 +84,8 @@ class CustomUserSerializer(UserSerializer):
         )
 
     def get_is_subscribed(self, obj):
-        user = self.context.get('request').user
-        if user.is_anonymous:
-            return False
-        return Follow.objects.filter(
-            user=user,
-            author=obj,
-        ).exists()
+        flags = self.get_user_flags()
+        return flags is not None and obj.id in flags[FOLLOWING]
 
 
 class FollowSerializer(ModelSerializer):
@@ -91,18 +121,37 @@ class FollowSerializer(ModelSerializer):
         ).data
 
 
-class RecipeSerializer(ModelSerializer):
+class ImageVariantsMixin:
+    """Адреса уменьшенных копий изображения рецепта."""
+
+    def build_absolute_url(self, url):
+        request = self.context.get('request')
+        if request is None or not url:
+            return url
+        return request.build_absolute_uri(url)
+
+    def get_image_variants(self, obj):
+        return {
+            variant: self.build_absolute_url(url)
+            for variant, url in get_variant_urls(
+                obj.image.name, obj.image_variants,
+            ).items()
+        }
+
+
+class RecipeSerializer(ImageVariantsMixin, ModelSerializer):
     """Сериализатор уникальных полей модели Recipe."""
 
+    image_variants = SerializerMethodField()
+
     class Meta:
         model = Recipe
-        fields = ('id', 'name', 'image', 'cooking_time')
+        fields = ('id', 'name', 'image', 'image_variants', 'cooking_time')
 
 
 class ShowFollowersSerializer(ModelSerializer):
     is_subscribed = SerializerMethodField()
     recipes = SerializerMethodField()
-    recipes_count = SerializerMethodField()
 
     class Meta:
         model = User
@@ -119,22 +168,34 @@ class ShowFollowersSerializer(ModelSerializer):
         read_only_fields = fields
 
     def get_is_subscribed(self, obj):
-        request = self.context.get('request')
-        if not request or request.user.is_anonymous:
-            return False
-        return obj.follower.filter(user=obj, author=request.user).exists()
+        # В подписках выводятся только авторы, на которых подписан
+        # пользователь.
+        return True
 
     def get_recipes(self, obj):
         request = self.context.get('request')
-        recipes = obj.recipes.all()[:(int(settings.RECIPES_LIMIT))]
+        if hasattr(obj, 'recipes_preview'):
+            recipes = obj.recipes_preview
+        else:
+            recipes = obj.recipes.all()[:get_recipes_limit(request)]
         return RecipeSerializer(
             recipes,
             many=True,
             context={'request': request},
         ).data
 
-    def get_recipes_count(self, obj):
-        return obj.recipes.count()
+
+class RecipeIdsSerializer(Serializer):
+    """Список id рецептов для массового добавления и удаления."""
+
+    recipes = ListField(
+        child=IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=settings.BULK_RECIPES_LIMIT,
+    )
+
+    def validate_recipes(self, data):
+        return list(dict.fromkeys(data))
 
 
 class IngredientsSerializer(ModelSerializer):
@@ -176,14 +237,13 @@ class ShowRecipeIngredientsSerializer(ModelSerializer):
         fields = ('id', 'name', 'measurement_unit', 'amount')
 
 
-class ShowRecipeFullSerializer(ModelSerializer):
-    """Сериализатор параметров рецепта."""
+class RecipePayloadSerializer(ImageVariantsMixin, ModelSerializer):
+    """Общая для всех пользователей часть рецепта, хранимая в кэше:
+    автор - только id, адреса изображений относительные."""
 
     tags = TagsSerializer(many=True, read_only=True)
-    author = CustomUserSerializer(read_only=True)
     ingredients = SerializerMethodField()
-    is_favorited = SerializerMethodField()
-    is_in_shopping_cart = SerializerMethodField()
+    image_variants = SerializerMethodField()
 
     class Meta:
         model = Recipe
@@ -192,32 +252,143 @@ class ShowRecipeFullSerializer(ModelSerializer):
             'tags',
             'author',
             'ingredients',
-            'is_favorited',
-            'is_in_shopping_cart',
             'name',
             'image',
+            'image_variants',
             'text',
             'cooking_time',
         )
 
     def get_ingredients(self, obj):
-        ingredients = RecipeIngredient.objects.filter(recipe=obj)
+        ingredients = obj.recipeingredient_set.all()
         return ShowRecipeIngredientsSerializer(ingredients, many=True).data
 
-    def get_is_favorited(self, obj):
-        request = self.context.get('request')
-        if not request or request.user.is_anonymous:
-            return False
-        return request.user.favorites.filter(recipe=obj).exists()
 
-    def get_is_in_shopping_cart(self, obj):
-        request = self.context.get('request')
-        if not request or request.user.is_anonymous:
-            return False
-        return ShoppingList.objects.filter(
-            recipe=obj,
-            user=request.user,
-        ).exists()
+def build_recipe_payloads(recipes):
+    prefetch_full_info(recipes)
+    return {
+        recipe.id: RecipePayloadSerializer(recipe).data for recipe in recipes
+    }
+
+
+def get_recipe_payloads(recipes):
+    """Кэшированные данные рецептов; промахи загружаются пачкой.
+
+    Промахи читаются с основной базы: данные отстающей реплики
+    остались бы в кэше после инвалидации. Без общего кэша
+    (CACHE_SHARED) сброс в одном воркере не виден остальным, поэтому
+    данные строятся на каждый запрос."""
+    if not settings.CACHE_SHARED:
+        payloads = build_recipe_payloads(recipes)
+        return [payloads[recipe.id] for recipe in recipes]
+    keys = get_recipe_payload_keys(recipe.id for recipe in recipes)
+    payloads = cache.get_many(keys.values())
+    missing = [recipe for recipe in recipes if keys[recipe.id] not in payloads]
+    if missing:
+        from_replica = replica_reads.get()
+        with primary_reads():
+            if from_replica:
+                missing = list(Recipe.objects.filter(
+                    id__in=[recipe.id for recipe in missing],
+                ))
+            fresh = {
+                keys[recipe_id]: payload
+                for recipe_id, payload in build_recipe_payloads(
+                    missing,
+                ).items()
+            }
+        cache.set_many(fresh, settings.RECIPE_PAYLOAD_CACHE_TIMEOUT)
+        payloads.update(fresh)
+    return [
+        payloads[keys[recipe.id]] for recipe in recipes
+        if keys[recipe.id] in payloads
+    ]
+
+
+def build_author_payloads(author_ids):
+    payloads = {}
+    for author in User.objects.filter(id__in=author_ids):
+        data = dict(CustomUserSerializer(author).data)
+        del data['is_subscribed']
+        payloads[author.id] = data
+    return payloads
+
+
+def get_author_payloads(author_ids):
+    """Кэшированные данные авторов без отметки подписки."""
+    if not settings.CACHE_SHARED:
+        return build_author_payloads(author_ids)
+    keys = get_author_payload_keys(author_ids)
+    cached = cache.get_many(keys.values())
+    payloads = {
+        author_id: cached[key]
+        for author_id, key in keys.items() if key in cached
+    }
+    missing = set(keys) - set(payloads)
+    if missing:
+        with primary_reads():
+            fresh = build_author_payloads(missing)
+        cache.set_many({
+            keys[author_id]: data for author_id, data in fresh.items()
+        }, settings.RECIPE_PAYLOAD_CACHE_TIMEOUT)
+        payloads.update(fresh)
+    return payloads
+
+
+class CachedRecipeListSerializer(ListSerializer):
+    """Список рецептов из кэша одним get_many вместо сериализации
+    каждого рецепта."""
+
+    def to_representation(self, data):
+        recipes = data.all() if isinstance(data, Manager) else data
+        return self.child.represent(list(recipes))
+
+
+class ShowRecipeFullSerializer(
+    UserFlagsMixin,
+    ImageVariantsMixin,
+    Serializer,
+):
+    """Сериализатор параметров рецепта.
+
+    Данные рецепта и автора берутся из кэша (RecipePayloadSerializer),
+    поверх них подставляются отметки текущего пользователя; поля
+    ответа задаёт represent."""
+
+    class Meta:
+        list_serializer_class = CachedRecipeListSerializer
+
+    def to_representation(self, recipe):
+        return self.represent([recipe])[0]
+
+    def represent(self, recipes):
+        payloads = get_recipe_payloads(recipes)
+        authors = get_author_payloads({
+            payload['author'] for payload in payloads
+        })
+        flags = self.get_user_flags() or {flag: () for flag in USER_FLAGS}
+        return [
+            {
+                'id': payload['id'],
+                'tags': payload['tags'],
+                'author': {
+                    **authors[payload['author']],
+                    'is_subscribed': payload['author'] in flags[FOLLOWING],
+                },
+                'ingredients': payload['ingredients'],
+                'is_favorited': payload['id'] in flags[FAVORITES],
+                'is_in_shopping_cart': payload['id'] in flags[SHOPPING_CART],
+                'name': payload['name'],
+                'image': self.build_absolute_url(payload['image']),
+                'image_variants': {
+                    variant: self.build_absolute_url(url)
+                    for variant, url in payload['image_variants'].items()
+                },
+                'text': payload['text'],
+                'cooking_time': payload['cooking_time'],
+            }
+            for payload in payloads
+        ]
 
 
 class AddRecipeIngredientsSerializer(ModelSerializer):
@@ -287,19 +458,78 @@ class AddRecipeSerializer(ModelSerializer):
         author = self.context.get('request').user
         tags_data = validated_data.pop('tags')
         ingredients_data = validated_data.pop('ingredients')
-        recipe = Recipe.objects.create(author=author, **validated_data)
+        recipe = Recipe.objects.create(
+            author=author,
+            tags_mask=get_tags_mask(tag.id for tag in tags_data),
+            **validated_data,
+        )
         self.add_recipe_ingredients(ingredients_data, recipe)
-        recipe.tags.set(tags_data)
+        RecipeTag.objects.bulk_create([
+            RecipeTag(recipe=recipe, tag=tag) for tag in tags_data
+        ])
         return recipe
 
+    def update_recipe_ingredients(self, ingredients, recipe):
+        """Запись только изменившихся строк RecipeIngredient."""
+        existing = {}
+        for row in recipe.recipeingredient_set.all():
+            existing.setdefault(row.ingredient_id, []).append(row)
+        to_create = []
+        to_update = []
+        for ingredient in ingredients:
+            ingredient_id = ingredient.get('id').id
+            amount = ingredient.get('amount')
+            rows = existing.get(ingredient_id)
+            if not rows:
+                to_create.append(RecipeIngredient(
+                    recipe=recipe,
+                    ingredient_id=ingredient_id,
+                    amount=amount,
+                ))
+            else:
+                row = rows.pop()
+                if row.amount != amount:
+                    row.amount = amount
+                    to_update.append(row)
+        to_delete = [row.id for rows in existing.values() for row in rows]
+        if not (to_delete or to_update or to_create):
+            return
+        carts = ShoppingList.objects.filter(recipe=recipe)
+        subtract_cart_totals(carts)
+        if to_delete:
+            RecipeIngredient.objects.filter(id__in=to_delete).delete()
+        if to_update:
+            RecipeIngredient.objects.bulk_update(to_update, ['amount'])
+        if to_create:
+            RecipeIngredient.objects.bulk_create(to_create)
+        add_cart_totals(carts)
+
+    def update_recipe_tags(self, tags, recipe):
+        """Добавление и удаление только изменившихся тегов."""
+        tag_ids = {tag.id for tag in tags}
+        current = set(RecipeTag.objects.filter(recipe=recipe).values_list(
+            'tag_id', flat=True,
+        ))
+        if current - tag_ids:
+            RecipeTag.objects.filter(
+                recipe=recipe,
+                tag_id__in=current - tag_ids,
+            ).delete()
+        if tag_ids - current:
+            RecipeTag.objects.bulk_create([
+                RecipeTag(recipe=recipe, tag_id=tag_id)
+                for tag_id in tag_ids - current
+            ])
+        recipe.tags_mask = get_tags_mask(tag_ids)
+
+    @transaction.atomic
     def update(self, recipe, validated_data):
         if 'ingredients' in self.initial_data:
-            ingredients = validated_data.pop('ingredients')
-            recipe.ingredients.clear()
-            self.add_recipe_ingredients(ingredients, recipe)
+            self.update_recipe_ingredients(
+                validated_data.pop('ingredients'), recipe,
+            )
         if 'tags' in self.initial_data:
-            tags_data = validated_data.pop('tags')
-            recipe.tags.set(tags_data)
+            self.update_recipe_tags(validated_data.pop('tags'), recipe)
         return super().update(recipe, validated_data)
 
     def to_representation(self, recipe):
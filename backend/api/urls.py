@@ -1,8 +1,11 @@
+from django.conf import settings
 from django.urls import include, path
 from djoser.views import TokenCreateView, TokenDestroyView
 from rest_framework import routers
 
+from api.async_views import async_routes
 from api.views_recipes import IngredientsViewSet, RecipeViewSet, TagsViewSet
+from api.views_service import MetricsView, ReadyView
 from api.views_users import FollowApiView, ListFollowViewSet
 
 router = routers.DefaultRouter()
@@ -11,6 +14,19 @@ router.register('ingredients', IngredientsViewSet, basename='ingredients')
 router.register('recipes', RecipeViewSet, basename='recipes')
 router.register('tags', TagsViewSet, basename='tags')
 
+ASYNC_ROUTES = (
+    'ingredients-list',
+    'ingredients-detail',
+    'recipes-list',
+    'recipes-detail',
+    'recipes-download-shopping-cart',
+    'tags-list',
+    'tags-detail',
+)
+router_urls = router.urls
+if settings.ASYNC_VIEWS:
+    router_urls = async_routes(router_urls, ASYNC_ROUTES)
+
 urlpatterns = [
     path(
         'users/subscriptions/',
@@ -22,8 +38,10 @@ urlpatterns = [
         FollowApiView.as_view(),
         name='subscribe',
     ),
+    path('metrics/', MetricsView.as_view(), name='metrics'),
+    path('ready/', ReadyView.as_view(), name='ready'),
     path('auth/token/login/', TokenCreateView.as_view(), name='login'),
     path('auth/token/logout/', TokenDestroyView.as_view(), name='logout'),
-    path('', include(router.urls)),
+    path('', include(router_urls)),
     path('', include('djoser.urls')),
 ]
@@ -1,3 +1,5 @@
+from django.db import transaction
+from django.db.models import Exists, F, OuterRef
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import permissions, viewsets, status
@@ -9,24 +11,56 @@ from api.permissions import IsAuthorOrReadOnly
 from api.serializers import (
     AddRecipeSerializer,
     IngredientsSerializer,
+    RecipeIdsSerializer,
     RecipeSerializer,
     ShowRecipeFullSerializer,
     TagsSerializer,
 )
-from foodgram.pagination import CustomPageNumberPaginator
-from recipes.mixins import RetriveAndListViewSet
+from foodgram.pagination import (
+    CustomPageNumberPaginator,
+    FeedCursorPaginator,
+    RecipeCursorPaginator,
+)
+from recipes.cache import (
+    INGREDIENTS_SCOPE,
+    TAGS_SCOPE,
+    invalidate_user_flags,
+)
+from recipes.ingredient_index import ingredient_index
+from recipes.mixins import (
+    CachedListMixin,
+    ReplicaReadMixin,
+    RetriveAndListViewSet,
+)
 from recipes.models import (
     Favorite,
+    FeedItem,
     Ingredient,
     Recipe,
-    RecipeIngredient,
+    ShoppingCartItem,
     ShoppingList,
     Tag,
+    User,
 )
+from recipes.shopping_cart import add_cart_totals, subtract_cart_totals
 from recipes.utils import download_response, get_ingredients_list
 
+ADDED = 'added'
+REMOVED = 'removed'
+ALREADY_ADDED = 'already_added'
+NOT_ADDED = 'not_added'
+NOT_FOUND = 'not_found'
+
+
+def lock_user(user):
+    """Блокировка строки пользователя до конца транзакции.
+
+    Параллельные запросы одного пользователя (двойной клик) читают
+    избранное и корзину по очереди, и счётчики не расходятся с базой."""
+    User.objects.select_for_update().filter(pk=user.pk).exists()
 
-class IngredientsViewSet(RetriveAndListViewSet):
+
+class IngredientsViewSet(CachedListMixin, RetriveAndListViewSet):
     """Ингредиенты."""
 
     queryset = Ingredient.objects.all().order_by('id')
@@ -35,18 +69,26 @@ class IngredientsViewSet(RetriveAndListViewSet):
     filterset_class = IngredientsFilter
     serializer_class = IngredientsSerializer
     pagination_class = None
+    cache_scope = INGREDIENTS_SCOPE
+
+    def get_list_data(self, request, *args, **kwargs):
+        name = request.query_params.get('name')
+        if name:
+            return ingredient_index.search(name)
+        return super().get_list_data(request, *args, **kwargs)
 
 
-class TagsViewSet(RetriveAndListViewSet):
+class TagsViewSet(CachedListMixin, RetriveAndListViewSet):
     """Теги."""
 
     queryset = Tag.objects.all()
     permission_classes = [permissions.AllowAny]
     serializer_class = TagsSerializer
     pagination_class = None
+    cache_scope = TAGS_SCOPE
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(ReplicaReadMixin, viewsets.ModelViewSet):
     """Рецепты."""
 
     queryset = Recipe.objects.all().order_by('-id')
@@ -55,13 +97,33 @@ class RecipeViewSet(viewsets.ModelViewSet):
     filterset_class = RecipeFilter
     pagination_class = CustomPageNumberPaginator
 
+    @property
+    def paginator(self):
+        """Паджинация по курсору включается параметром cursor."""
+        if not hasattr(self, '_paginator'):
+            if 'cursor' in self.request.query_params:
+                self._paginator = RecipeCursorPaginator()
+            else:
+                self._paginator = self.pagination_class()
+        return self._paginator
+
     def get_serializer_class(self):
         if self.request.method == 'GET':
             return ShowRecipeFullSerializer
         return AddRecipeSerializer
 
+    @transaction.atomic
+    def perform_create(self, serializer):
+        serializer.save()
+
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        instance.delete()
+
+    @transaction.atomic
     def add_obj(self, model, user, id):
         """Функция добавления нового объекта выбранной модели."""
+        lock_user(user)
         if model.objects.filter(user=user, recipe__id=id).exists():
             return Response(
                 {'errors': 'Рецепт уже добавлен!'},
@@ -69,14 +131,23 @@ class RecipeViewSet(viewsets.ModelViewSet):
             )
         recipe = get_object_or_404(Recipe, id=id)
         model.objects.create(user=user, recipe=recipe)
+        self.change_cart_totals(
+            model, model.objects.filter(user=user, recipe=recipe), 1,
+        )
+        invalidate_user_flags(user.id)
         serialized_obj = RecipeSerializer(recipe)
         return Response(serialized_obj.data, status=status.HTTP_201_CREATED)
 
+    @transaction.atomic
     def delete_obj(self, model, user, id):
         """Функция удаления выбранного объекта модели."""
+        lock_user(user)
         recipe = model.objects.filter(user=user, recipe__id=id)
         if recipe.exists():
+            self.change_cart_totals(model, recipe, -1)
+            self.change_favorites_count(model, [int(id)], -1)
             recipe.delete()
+            invalidate_user_flags(user.id)
             return Response(status=status.HTTP_204_NO_CONTENT)
         return Response(
             {'errors': 'Рецепт уже удален!'},
@@ -123,11 +194,191 @@ class RecipeViewSet(viewsets.ModelViewSet):
                 id=pk,
             )
 
+    def get_bulk_state(self, model, user, recipe_ids):
+        """Одним запросом: какие рецепты существуют и какие уже выбраны."""
+        return dict(Recipe.objects.filter(id__in=recipe_ids).annotate(
+            selected=Exists(model.objects.filter(
+                user=user,
+                recipe=OuterRef('pk'),
+            )),
+        ).values_list('id', 'selected'))
+
+    def change_favorites_count(self, model, recipe_ids, delta):
+        """Удаление избранного идёт без сигналов, поэтому счётчик
+        правится здесь."""
+        if model is not Favorite or not recipe_ids:
+            return
+        recipes = Recipe.objects.filter(id__in=recipe_ids)
+        if delta < 0:
+            recipes = recipes.filter(favorites_count__gt=0)
+        recipes.update(favorites_count=F('favorites_count') + delta)
+
+    def change_cart_totals(self, model, objs, sign):
+        """Правка сумм ингредиентов корзины: после добавления строк
+        ShoppingList или перед их удалением."""
+        if model is not ShoppingList:
+            return
+        if sign > 0:
+            add_cart_totals(objs)
+        else:
+            subtract_cart_totals(objs)
+
+    def bulk_response(self, recipe_ids, statuses):
+        return Response({'results': [
+            {'id': recipe_id, 'status': statuses[recipe_id]}
+            for recipe_id in recipe_ids
+        ]})
+
+    @transaction.atomic
+    def add_objs(self, model, user, recipe_ids):
+        """Массовое добавление рецептов в избранное или корзину."""
+        lock_user(user)
+        state = self.get_bulk_state(model, user, recipe_ids)
+        added = [
+            recipe_id for recipe_id in recipe_ids
+            if recipe_id in state and not state[recipe_id]
+        ]
+        model.objects.bulk_create(
+            [model(user=user, recipe_id=recipe_id) for recipe_id in added],
+            ignore_conflicts=True,
+        )
+        if added:
+            self.change_cart_totals(model, model.objects.filter(
+                user=user, recipe_id__in=added,
+            ), 1)
+        self.change_favorites_count(model, added, 1)
+        if added:
+            invalidate_user_flags(user.id)
+        return self.bulk_response(recipe_ids, {
+            recipe_id: (
+                NOT_FOUND if recipe_id not in state
+                else ALREADY_ADDED if state[recipe_id]
+                else ADDED
+            )
+            for recipe_id in recipe_ids
+        })
+
+    @transaction.atomic
+    def delete_objs(self, model, user, recipe_ids):
+        """Массовое удаление рецептов из избранного или корзины."""
+        lock_user(user)
+        state = self.get_bulk_state(model, user, recipe_ids)
+        removed = [
+            recipe_id for recipe_id in recipe_ids if state.get(recipe_id)
+        ]
+        if removed:
+            objs = model.objects.filter(user=user, recipe_id__in=removed)
+            self.change_cart_totals(model, objs, -1)
+            # Без сигналов удаления Django удаляет одним DELETE ... IN.
+            objs.delete()
+        self.change_favorites_count(model, removed, -1)
+        if removed:
+            invalidate_user_flags(user.id)
+        return self.bulk_response(recipe_ids, {
+            recipe_id: (
+                NOT_FOUND if recipe_id not in state
+                else REMOVED if state[recipe_id]
+                else NOT_ADDED
+            )
+            for recipe_id in recipe_ids
+        })
+
+    def bulk_action(self, model, request):
+        serializer = RecipeIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        recipe_ids = serializer.validated_data['recipes']
+        if request.method == 'POST':
+            return self.add_objs(model, request.user, recipe_ids)
+        return self.delete_objs(model, request.user, recipe_ids)
+
+    @action(
+        methods=['POST', 'DELETE'],
+        detail=False,
+        url_path='favorite',
+        url_name='favorite-bulk',
+        permission_classes=[permissions.IsAuthenticated],
+    )
+    def favorite_bulk(self, request):
+        """Массовое добавление и удаление ./favorite/ {"recipes": [id]}."""
+        return self.bulk_action(Favorite, request)
+
+    @action(
+        methods=['POST', 'DELETE'],
+        detail=False,
+        url_path='shopping_cart',
+        url_name='shopping-cart-bulk',
+        permission_classes=[permissions.IsAuthenticated],
+    )
+    def shopping_cart_bulk(self, request):
+        """Массовое добавление и удаление ./shopping_cart/."""
+        return self.bulk_action(ShoppingList, request)
+
+    @action(
+        methods=['DELETE'],
+        detail=False,
+        permission_classes=[permissions.IsAuthenticated],
+    )
+    @transaction.atomic
+    def clear_shopping_cart(self, request):
+        """Очистка списка покупок ./clear_shopping_cart/."""
+        lock_user(request.user)
+        cart = ShoppingList.objects.filter(user=request.user)
+        recipe_ids = list(cart.values_list('recipe_id', flat=True))
+        cart.delete()
+        ShoppingCartItem.objects.filter(user=request.user).delete()
+        invalidate_user_flags(request.user.id)
+        return self.bulk_response(
+            recipe_ids, dict.fromkeys(recipe_ids, REMOVED),
+        )
+
     @action(detail=False, permission_classes=[permissions.IsAuthenticated])
     def download_shopping_cart(self, request):
         """Метод скачивания списка покупок ./download_shopping_cart/."""
-        ingredients_list = RecipeIngredient.objects.filter(
-            recipe__shopping_cart__user=request.user
-        )
+        ingredients_list = list(ShoppingCartItem.objects.filter(
+            user=request.user,
+        ).values(
+            name=F('ingredient__name'),
+            measurement_unit=F('ingredient__measurement_unit'),
+            total_amount=F('amount'),
+        ).order_by('name', 'measurement_unit'))
         list_to_buy = get_ingredients_list(ingredients_list)
         return download_response(list_to_buy, 'Список покупок.txt')
+
+    @action(detail=False, permission_classes=[permissions.IsAuthenticated])
+    def shopping_cart_summary(self, request):
+        """Текущие суммы ингредиентов корзины ./shopping_cart_summary/."""
+        items = ShoppingCartItem.objects.filter(
+            user=request.user,
+        ).values_list(
+            'ingredient_id',
+            'ingredient__name',
+            'ingredient__measurement_unit',
+            'amount',
+        ).order_by('ingredient__name', 'ingredient__measurement_unit')
+        return Response([
+            {
+                'id': ingredient_id,
+                'name': name,
+                'measurement_unit': measurement_unit,
+                'amount': amount,
+            }
+            for ingredient_id, name, measurement_unit, amount in items
+        ])
+
+    @action(detail=False, permission_classes=[permissions.IsAuthenticated])
+    def feed(self, request):
+        """Метод получения ленты подписок ./feed/."""
+        paginator = FeedCursorPaginator()
+        items = paginator.paginate_queryset(
+            FeedItem.objects.filter(user=request.user).only('recipe_id'),
+            request,
+            view=self,
+        )
+        recipe_ids = [item.recipe_id for item in items]
+        recipes = Recipe.objects.in_bulk(recipe_ids)
+        serializer = ShowRecipeFullSerializer(
+            [recipes[id] for id in recipe_ids if id in recipes],
+            many=True,
+            context=self.get_serializer_context(),
+        )
+        return paginator.get_paginated_response(serializer.data)
@@ -0,0 +1,52 @@
+from django.db import DatabaseError, connections
+from django.http import HttpResponse
+from rest_framework import permissions, status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from foodgram import warmup
+from foodgram.metrics import render_metrics
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class MetricsView(APIView):
+    """Метрики всех воркеров в формате Prometheus, только для staff."""
+    permission_classes = (permissions.IsAdminUser,)
+
+    def get(self, request):
+        return HttpResponse(
+            render_metrics(),
+            content_type=PROMETHEUS_CONTENT_TYPE,
+        )
+
+
+class ReadyView(APIView):
+    """Готовность воркера к приёму трафика: доступны все базы.
+
+    В ответе также видно, прогреты ли справочники (foodgram.warmup).
+    """
+    authentication_classes = ()
+    permission_classes = (permissions.AllowAny,)
+
+    def get(self, request):
+        databases = {}
+        for alias in connections:
+            try:
+                with connections[alias].cursor() as cursor:
+                    cursor.execute('SELECT 1')
+                databases[alias] = 'ok'
+            except DatabaseError:
+                databases[alias] = 'unavailable'
+        ready = all(value == 'ok' for value in databases.values())
+        return Response(
+            {
+                'ready': ready,
+                'warmed_up': warmup.warmed_up,
+                'databases': databases,
+            },
+            status=(
+                status.HTTP_200_OK if ready
+                else status.HTTP_503_SERVICE_UNAVAILABLE
+            ),
+        )
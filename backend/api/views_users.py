@@ -7,6 +7,10 @@ from rest_framework.views import APIView
 
 from api.serializers import FollowSerializer, ShowFollowersSerializer
 from foodgram.pagination import CustomPageNumberPaginator
+from recipes.cache import invalidate_user_flags
+from recipes.feed import backfill_feed, trim_feed
+from recipes.models import Recipe
+from recipes.utils import get_recipes_limit
 from users.models import Follow
 
 User = get_user_model()
@@ -23,6 +27,8 @@ class FollowApiView(APIView):
         serializer = FollowSerializer(data=data, context={'request': request})
         serializer.is_valid(raise_exception=True)
         Follow.objects.create(user=request.user, author=author)
+        invalidate_user_flags(request.user.id)
+        backfill_feed(request.user.id, author.id)
         return Response(status=status.HTTP_201_CREATED)
 
     def delete(self, request, id):
@@ -30,6 +36,8 @@ class FollowApiView(APIView):
         author = get_object_or_404(User, id=id)
         subscription = get_object_or_404(Follow, user=user, author=author)
         subscription.delete()
+        invalidate_user_flags(user.id)
+        trim_feed(user.id, author.id)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
@@ -42,3 +50,19 @@ class ListFollowViewSet(generics.ListAPIView):
 
     def get_queryset(self):
         return User.objects.filter(following__user=self.request.user)
+
+    def paginate_queryset(self, queryset):
+        """Подгружает превью рецептов всех авторов страницы разом."""
+        page = super().paginate_queryset(queryset)
+        if page is None:
+            return page
+        authors = {author.id: author for author in page}
+        for author in page:
+            author.recipes_preview = []
+        previews = Recipe.objects.previews(
+            list(authors),
+            get_recipes_limit(self.request),
+        )
+        for recipe in previews:
+            authors[recipe.author_id].recipes_preview.append(recipe)
+        return page
@@ -0,0 +1,109 @@
+import asyncio
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+from rest_framework.permissions import SAFE_METHODS
+
+REPLICA_DB_ALIAS = 'replica'
+REPLICA_ROUTER = 'foodgram.db_router.ReplicaRouter'
+
+replica_reads = ContextVar('replica_reads', default=False)
+
+
+def is_replica_configured():
+    return (
+        REPLICA_DB_ALIAS in settings.DATABASES
+        and REPLICA_ROUTER in settings.DATABASE_ROUTERS
+    )
+
+
+def get_pin_cache_key(user_id):
+    return f'db:primary:{user_id}'
+
+
+def pin_to_primary(user_id):
+    """Чтение пользователя с основной базы на REPLICA_PIN_TIMEOUT
+    секунд после его записи, пока реплика не догонит основную."""
+    cache.set(get_pin_cache_key(user_id), True, settings.REPLICA_PIN_TIMEOUT)
+
+
+def is_pinned_to_primary(user):
+    return user.is_authenticated and bool(
+        cache.get(get_pin_cache_key(user.id))
+    )
+
+
+@contextmanager
+def primary_reads():
+    """Чтение с основной базы внутри блока.
+
+    Нужно там, где прочитанное кладётся в долгоживущий кэш: данные
+    отстающей реплики остались бы в нём после инвалидации."""
+    token = replica_reads.set(False)
+    try:
+        yield
+    finally:
+        replica_reads.reset(token)
+
+
+class ReplicaRouter:
+    """Чтение с реплики, если его разрешил view (ReplicaReadMixin),
+    всё остальное — с основной базы."""
+
+    def db_for_read(self, model, **hints):
+        if (
+            replica_reads.get()
+            and not connections[DEFAULT_DB_ALIAS].in_atomic_block
+        ):
+            return REPLICA_DB_ALIAS
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
+
+
+class PinPrimaryMiddleware:
+    """Закрепление пользователя за основной базой после успешного
+    небезопасного запроса.
+
+    Пользователь берётся из запроса после view: DRF сохраняет
+    аутентифицированного по токену пользователя в request.user."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        response = self.get_response(request)
+        self.pin(request, response)
+        return response
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        self.pin(request, response)
+        return response
+
+    def pin(self, request, response):
+        user = getattr(request, 'user', None)
+        if (
+            request.method not in SAFE_METHODS
+            and response.status_code < 400
+            and user is not None
+            and user.is_authenticated
+        ):
+            pin_to_primary(user.id)
@@ -0,0 +1,365 @@
+import asyncio
+import atexit
+import fcntl
+import json
+import os
+import shutil
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10,
+)
+QUERIES_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200)
+SIZE_BUCKETS = (
+    256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304,
+)
+HISTOGRAMS = {
+    'latency': (
+        'foodgram_http_request_duration_seconds',
+        'Время обработки запроса.',
+        LATENCY_BUCKETS,
+    ),
+    'queries': (
+        'foodgram_db_queries_per_request',
+        'Число SQL-запросов на один HTTP-запрос.',
+        QUERIES_BUCKETS,
+    ),
+    'size': (
+        'foodgram_http_response_size_bytes',
+        'Размер тела ответа.',
+        SIZE_BUCKETS,
+    ),
+}
+UNRESOLVED = '<unresolved>'
+
+
+def _histogram(buckets):
+    return {'buckets': [0] * (len(buckets) + 1), 'sum': 0, 'count': 0}
+
+
+def _merge_histogram(target, source):
+    for index, value in enumerate(source['buckets']):
+        target['buckets'][index] += value
+    target['sum'] += source['sum']
+    target['count'] += source['count']
+
+
+RETIRED_FILE = 'retired.json'
+LOCK_FILE = '.lock'
+
+
+def _empty_totals():
+    return {
+        'requests': {},
+        'db_time': {},
+        'histograms': {name: {} for name in HISTOGRAMS},
+    }
+
+
+def _merge_totals(total, snapshot):
+    for field in ('requests', 'db_time'):
+        for key, value in snapshot[field].items():
+            total[field][key] = total[field].get(key, 0) + value
+    for name, views in snapshot['histograms'].items():
+        for view, histogram in views.items():
+            target = total['histograms'][name].setdefault(
+                view, _histogram(HISTOGRAMS[name][2]),
+            )
+            _merge_histogram(target, histogram)
+
+
+def _read_snapshot(path):
+    try:
+        return json.loads(path.read_text())
+    except (OSError, ValueError):
+        return None
+
+
+def _write_snapshot(path, snapshot):
+    temporary = path.with_suffix('.tmp')
+    temporary.write_text(json.dumps(snapshot))
+    os.replace(temporary, path)
+
+
+def _is_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def clear_snapshots():
+    """Удаление снимков прошлого запуска; вызывается мастером gunicorn
+    до запуска воркеров (gunicorn.conf.py)."""
+    if settings.METRICS_DIR:
+        shutil.rmtree(settings.METRICS_DIR, ignore_errors=True)
+
+
+class Metrics:
+    """Метрики запросов процесса.
+
+    Каждый воркер gunicorn копит свои значения и периодически
+    сохраняет их в METRICS_DIR/<pid>-<время запуска>.json, поэтому
+    новый процесс с тем же pid не перезапишет снимок прежнего.
+    Эндпоинт метрик суммирует файлы всех воркеров, а снимки
+    завершившихся процессов переносит в retired.json: счётчики не
+    сбрасываются при перезапуске воркеров, и файлы не копятся."""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        """Пустые счётчики и имя снимка нового процесса; после fork
+        воркер не должен продолжать снимок мастера."""
+        self.lock = threading.Lock()
+        self.requests = {}
+        self.db_time = {}
+        self.histograms = {name: {} for name in HISTOGRAMS}
+        self.flushed_at = 0
+        self.name = f'{os.getpid()}-{time.time_ns()}'
+
+    def observe(self, name, view, value):
+        buckets = HISTOGRAMS[name][2]
+        histogram = self.histograms[name].setdefault(
+            view, _histogram(buckets),
+        )
+        histogram['buckets'][bisect_left(buckets, value)] += 1
+        histogram['sum'] += value
+        histogram['count'] += 1
+
+    def record(self, view, method, status, latency, queries, db_time):
+        key = f'{view} {method} {status}'
+        with self.lock:
+            self.requests[key] = self.requests.get(key, 0) + 1
+            self.db_time[view] = self.db_time.get(view, 0) + db_time
+            self.observe('latency', view, latency)
+            self.observe('queries', view, queries)
+        self.maybe_flush()
+
+    def record_size(self, view, size):
+        with self.lock:
+            self.observe('size', view, size)
+
+    def snapshot(self):
+        with self.lock:
+            return json.loads(json.dumps({
+                'requests': self.requests,
+                'db_time': self.db_time,
+                'histograms': self.histograms,
+            }))
+
+    def maybe_flush(self):
+        interval = settings.METRICS_FLUSH_INTERVAL
+        if time.monotonic() - self.flushed_at >= interval:
+            self.flush()
+
+    def flush(self):
+        self.flushed_at = time.monotonic()
+        if not settings.METRICS_DIR or not self.requests:
+            return
+        directory = Path(settings.METRICS_DIR)
+        directory.mkdir(parents=True, exist_ok=True)
+        _write_snapshot(directory / f'{self.name}.json', self.snapshot())
+
+    def collect(self):
+        """Сумма снимков всех воркеров.
+
+        Под блокировкой каталога, чтобы параллельные запросы метрик
+        не перенесли один снимок в retired.json дважды."""
+        self.flush()
+        if not settings.METRICS_DIR:
+            return self.snapshot()
+        directory = Path(settings.METRICS_DIR)
+        directory.mkdir(parents=True, exist_ok=True)
+        with open(directory / LOCK_FILE, 'w') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            return self.collect_locked(directory)
+
+    def collect_locked(self, directory):
+        retired_path = directory / RETIRED_FILE
+        retired = _read_snapshot(retired_path) or _empty_totals()
+        live = []
+        pruned = False
+        for path in directory.glob('*-*.json'):
+            pid = path.stem.split('-')[0]
+            snapshot = _read_snapshot(path)
+            if not pid.isdigit() or snapshot is None:
+                continue
+            if _is_alive(int(pid)):
+                live.append(snapshot)
+                continue
+            _merge_totals(retired, snapshot)
+            path.unlink()
+            pruned = True
+        if pruned:
+            _write_snapshot(retired_path, retired)
+        total = _empty_totals()
+        for snapshot in (retired, *live):
+            _merge_totals(total, snapshot)
+        return total
+
+
+metrics = Metrics()
+atexit.register(metrics.flush)
+os.register_at_fork(after_in_child=metrics.reset)
+
+
+def _labels(**labels):
+    return ','.join(
+        '{}="{}"'.format(
+            name, str(value).replace('\\', '\\\\').replace('"', '\\"'),
+        )
+        for name, value in labels.items()
+    )
+
+
+def render_metrics():
+    """Метрики в текстовом формате Prometheus."""
+    data = metrics.collect()
+    lines = [
+        '# HELP foodgram_http_requests_total Число HTTP-запросов.',
+        '# TYPE foodgram_http_requests_total counter',
+    ]
+    for key, value in sorted(data['requests'].items()):
+        view, method, status = key.split(' ')
+        labels = _labels(view=view, method=method, status=status)
+        lines.append(f'foodgram_http_requests_total{{{labels}}} {value}')
+    lines += [
+        '# HELP foodgram_db_duration_seconds_total Время SQL-запросов.',
+        '# TYPE foodgram_db_duration_seconds_total counter',
+    ]
+    for view, value in sorted(data['db_time'].items()):
+        lines.append(
+            f'foodgram_db_duration_seconds_total{{{_labels(view=view)}}} '
+            f'{value:.6f}'
+        )
+    for name, (metric, description, buckets) in HISTOGRAMS.items():
+        lines += [
+            f'# HELP {metric} {description}',
+            f'# TYPE {metric} histogram',
+        ]
+        for view, histogram in sorted(data['histograms'][name].items()):
+            cumulative = 0
+            for bound, value in zip(
+                (*buckets, '+Inf'), histogram['buckets'],
+            ):
+                cumulative += value
+                labels = _labels(view=view, le=bound)
+                lines.append(f'{metric}_bucket{{{labels}}} {cumulative}')
+            labels = _labels(view=view)
+            lines.append(f'{metric}_sum{{{labels}}} {histogram["sum"]}')
+            lines.append(f'{metric}_count{{{labels}}} {histogram["count"]}')
+    return '\n'.join(lines) + '\n'
+
+
+class QueryCounter:
+    """Число и суммарное время SQL-запросов текущего HTTP-запроса."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0
+
+
+current_counter = ContextVar('metrics_query_counter', default=None)
+
+
+def count_queries(execute, sql, params, many, context):
+    """execute_wrapper всех соединений.
+
+    Счётчик берётся из contextvar, поэтому учитываются и запросы,
+    выполненные в пуле потоков асинхронных view (api/async_views.py)."""
+    counter = current_counter.get()
+    if counter is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        counter.count += 1
+        counter.duration += time.perf_counter() - started
+
+
+@receiver(connection_created)
+def install_query_counter(sender, connection, **kwargs):
+    if count_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(count_queries)
+
+
+def _count_size(view, content):
+    size = 0
+    for chunk in content:
+        size += len(chunk)
+        yield chunk
+    metrics.record_size(view, size)
+
+
+class MetricsMiddleware:
+    """Число запросов, задержка, SQL-запросы и размер ответа по view.
+
+    Работает и в синхронном, и в асинхронном режиме, чтобы под ASGI
+    не переводить весь стек middleware в поток синхронного кода."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+        for connection in connections.all():
+            install_query_counter(None, connection)
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        counter = QueryCounter()
+        token = current_counter.set(counter)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            current_counter.reset(token)
+        self.record(request, response, started, counter)
+        return response
+
+    async def __acall__(self, request):
+        counter = QueryCounter()
+        token = current_counter.set(counter)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_counter.reset(token)
+        self.record(request, response, started, counter)
+        return response
+
+    def record(self, request, response, started, counter):
+        latency = time.perf_counter() - started
+        match = request.resolver_match
+        view = match.view_name if match else UNRESOLVED
+        if response.streaming:
+            response.streaming_content = _count_size(
+                view, response.streaming_content,
+            )
+        else:
+            metrics.record_size(view, len(response.content))
+        metrics.record(
+            view,
+            request.method,
+            response.status_code,
+            latency,
+            counter.count,
+            counter.duration,
+        )
@@ -1,7 +1,75 @@
-from rest_framework.pagination import PageNumberPagination
+from collections import OrderedDict
+from hashlib import md5
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+from rest_framework.response import Response
+
+PERSONAL_FILTERS = ('is_favorited', 'is_in_shopping_cart')
 
 
 class CustomPageNumberPaginator(PageNumberPagination):
     """Настройка паджинатора."""
 
     page_size_query_param = 'limit'
+
+
+class RecipeCursorPaginator(CursorPagination):
+    """Паджинатор по курсору для ленты рецептов.
+
+    Страницы выбираются по ключу id без OFFSET, а общее количество
+    рецептов считается не чаще раза в RECIPES_COUNT_CACHE_TIMEOUT секунд
+    для одного набора фильтров.
+    """
+
+    ordering = '-id'
+    page_size_query_param = 'limit'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.count = self.get_count(queryset, request)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_count_cache_key(self, request):
+        params = sorted(
+            (key, value)
+            for key, values in request.query_params.lists()
+            if key not in (self.cursor_query_param, self.page_size_query_param)
+            for value in values
+        )
+        if any(key in PERSONAL_FILTERS for key, _ in params):
+            params.append(('user', request.user.pk))
+        digest = md5(urlencode(params).encode()).hexdigest()
+        return f'recipes_count:{digest}'
+
+    def get_count(self, queryset, request):
+        key = self.get_count_cache_key(request)
+        count = cache.get(key)
+        if count is None:
+            count = queryset.count()
+            cache.set(key, count, settings.RECIPES_COUNT_CACHE_TIMEOUT)
+        return count
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('count', self.count),
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        response_schema = super().get_paginated_response_schema(schema)
+        response_schema['properties'] = OrderedDict([
+            ('count', {'type': 'integer', 'example': 123}),
+            *response_schema['properties'].items(),
+        ])
+        return response_schema
+
+
+class FeedCursorPaginator(CursorPagination):
+    """Паджинатор ленты подписок: диапазон по (user, recipe_id)."""
+
+    ordering = '-recipe_id'
+    page_size_query_param = 'limit'
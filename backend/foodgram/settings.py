@@ -1,6 +1,7 @@
 import os
 from pathlib import Path
 
+from django.core.exceptions import ImproperlyConfigured
 from dotenv import load_dotenv
 from typing_extensions import Final
 
@@ -37,6 +38,8 @@ INSTALLED_APPS = [
 AUTH_USER_MODEL = 'users.User'
 
 MIDDLEWARE = [
+    'foodgram.metrics.MetricsMiddleware',
+    'foodgram.db_router.PinPrimaryMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -77,6 +80,48 @@ DATABASES = {
     }
 }
 
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', default='foodgram'),
+    }
+}
+
+# Кэш в памяти процесса у каждого воркера свой, и сброс записей после
+# изменения данных до других воркеров не доходит. Данные, которые
+# сбрасываются при записи, кэшируются только в общем кэше.
+LOCAL_CACHE_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+CACHE_SHARED = os.getenv(
+    'CACHE_SHARED',
+    default=str(CACHES['default']['BACKEND'] not in LOCAL_CACHE_BACKENDS),
+) == 'True'
+
+# Пользователь закрепляется за основной базой после записи через кэш
+# (foodgram.db_router), и закрепление должно быть видно всем воркерам.
+if os.getenv('DB_REPLICA_NAME') or os.getenv('DB_REPLICA_HOST'):
+    if not CACHE_SHARED:
+        raise ImproperlyConfigured(
+            'Чтение с реплики требует общего кэша: CACHE_SHARED=True.'
+        )
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'NAME': os.getenv('DB_REPLICA_NAME', default=DATABASES['default']['NAME']),
+        'HOST': os.getenv('DB_REPLICA_HOST', default=DATABASES['default']['HOST']),
+        'PORT': os.getenv('DB_REPLICA_PORT', default=DATABASES['default']['PORT']),
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_ROUTERS = ['foodgram.db_router.ReplicaRouter']
+
+ASYNC_VIEWS = os.getenv('ASYNC_VIEWS', default='False') == 'True'
+
+# Пустое значение - метрики только текущего процесса.
+METRICS_DIR = os.getenv('METRICS_DIR', default='/tmp/foodgram-metrics')
+
+REFERENCE_CACHE_SHARED = os.getenv('REFERENCE_CACHE_SHARED', default='False') == 'True'
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -97,7 +142,7 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.AllowAny',
     ),
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.CachedTokenAuthentication',
     ),
     'DEFAULT_FILTER_BACKENDS': (
         'django_filters.rest_framework.DjangoFilterBackend',
@@ -141,10 +186,25 @@ MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 # Блок констант
 TWO: Final[int] = 2
 RECIPES_LIMIT: Final[int] = 4
+RECIPES_COUNT_CACHE_TIMEOUT: Final[int] = 60
+REFERENCE_CACHE_SIZE: Final[int] = 256
+LOCAL_VERSION_TIMEOUT: Final[int] = 30
+USER_FLAGS_CACHE_TIMEOUT: Final[int] = 60 * 60
+IMAGE_THUMBNAIL_SIZE: Final[tuple] = (480, 480)
+IMAGE_WEBP_SIZE: Final[tuple] = (1280, 1280)
+IMAGE_VARIANTS_WORKERS: Final[int] = 2
+FEED_BATCH_SIZE: Final[int] = 1000
+FEED_BACKFILL_LIMIT: Final[int] = 1000
+METRICS_FLUSH_INTERVAL: Final[int] = 5
+AUTH_TOKEN_CACHE_TIMEOUT: Final[int] = 5 * 60
+ASYNC_DB_WORKERS: Final[int] = 16
+BULK_RECIPES_LIMIT: Final[int] = 100
+RECIPE_PAYLOAD_CACHE_TIMEOUT: Final[int] = 60 * 60
+REPLICA_PIN_TIMEOUT: Final[int] = 10
 
 LOGGING = {
     'version': 1,
-    'disable_existing_loggers': True,
+    'disable_existing_loggers': False,
     'filters': {
         'require_debug_false': {
             '()': 'django.utils.log.RequireDebugFalse',
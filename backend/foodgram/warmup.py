@@ -0,0 +1,81 @@
+import inspect
+import logging
+import time
+
+from django.core.cache import caches
+from django.db import DatabaseError, connections
+from django.urls import get_resolver
+from rest_framework.serializers import Serializer
+from rest_framework.test import APIRequestFactory
+
+logger = logging.getLogger(__name__)
+
+REFERENCE_PATHS = ('/api/tags/', '/api/ingredients/')
+
+warmed_up = False
+
+
+def warm_serializers():
+    """Поля всех сериализаторов API: первое построение полей
+    заполняет кэши _meta моделей и импортирует валидаторы."""
+
+    from api import serializers
+
+    for _, serializer_class in inspect.getmembers(
+        serializers, inspect.isclass,
+    ):
+        if (
+            issubclass(serializer_class, Serializer)
+            and serializer_class.__module__ == serializers.__name__
+        ):
+            serializer_class().fields
+
+
+def warm_reference_data():
+    """Справочники тегов и ингредиентов: ответы списков, индекс
+    автодополнения и словарь тегов для фильтра."""
+
+    from api.views_recipes import IngredientsViewSet, TagsViewSet
+    from recipes.cache import get_tag_ids_by_slug
+    from recipes.ingredient_index import ingredient_index
+
+    factory = APIRequestFactory()
+    for path, viewset in zip(
+        REFERENCE_PATHS, (TagsViewSet, IngredientsViewSet),
+    ):
+        viewset.as_view({'get': 'list'})(factory.get(path))
+    ingredient_index.search('')
+    get_tag_ids_by_slug()
+
+
+def close_connections():
+    """Соединения, открытые до fork, не должны достаться воркерам."""
+
+    connections.close_all()
+    for cache in caches.all():
+        cache.close()
+
+
+def warm_up():
+    """Прогрев процесса до приёма запросов.
+
+    С preload_app выполняется в мастере gunicorn, и воркеры получают
+    готовые резолверы и справочники при fork (см. gunicorn.conf.py).
+    Недоступная база не мешает запуску: справочники загрузятся при
+    первых запросах. Возвращает длительность прогрева в секундах."""
+
+    global warmed_up
+    started = time.perf_counter()
+    resolver = get_resolver()
+    resolver.reverse_dict
+    resolver.resolve('/api/recipes/')
+    warm_serializers()
+    try:
+        warm_reference_data()
+    except DatabaseError:
+        logger.warning('Справочники не загружены: база недоступна.')
+    else:
+        warmed_up = True
+    finally:
+        close_connections()
+    return time.perf_counter() - started
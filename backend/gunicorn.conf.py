@@ -0,0 +1,87 @@
+"""Настройки gunicorn: gunicorn -c gunicorn.conf.py.
+
+WORKER_CLASS выбирает модель воркеров:
+sync — процессы по одному запросу, 2 * CPU + 1 воркер;
+gthread — потоки в процессе, CPU + 1 воркер по GUNICORN_THREADS потоков;
+uvicorn — ASGI (foodgram.asgi), по воркеру на CPU.
+GUNICORN_WORKERS задаёт число воркеров явно, GUNICORN_PRELOAD=False
+отключает загрузку приложения в мастере.
+"""
+import os
+
+WSGI_APPLICATION = 'foodgram.wsgi:application'
+ASGI_APPLICATION = 'foodgram.asgi:application'
+WORKER_CLASSES = {
+    'sync': ('sync', WSGI_APPLICATION),
+    'gthread': ('gthread', WSGI_APPLICATION),
+    'uvicorn': ('uvicorn.workers.UvicornWorker', ASGI_APPLICATION),
+}
+
+
+def cpu_count():
+    """Число CPU, доступных процессу, с учётом привязки контейнера."""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def default_workers(worker_class, cpus):
+    if worker_class == 'sync':
+        return 2 * cpus + 1
+    if worker_class == 'gthread':
+        return cpus + 1
+    return cpus
+
+
+WORKER_CLASS = os.getenv('WORKER_CLASS', default='sync')
+if WORKER_CLASS not in WORKER_CLASSES:
+    raise ValueError(
+        f'WORKER_CLASS: {WORKER_CLASS}, ожидается одно из '
+        f'{", ".join(WORKER_CLASSES)}.'
+    )
+
+worker_class, wsgi_app = WORKER_CLASSES[WORKER_CLASS]
+workers = int(os.getenv(
+    'GUNICORN_WORKERS',
+    default=default_workers(WORKER_CLASS, cpu_count()),
+))
+# gunicorn сам меняет sync на gthread, если потоков больше одного.
+threads = (
+    int(os.getenv('GUNICORN_THREADS', default=4))
+    if WORKER_CLASS == 'gthread' else 1
+)
+bind = os.getenv('GUNICORN_BIND', default='0.0.0.0:8000')
+timeout = int(os.getenv('GUNICORN_TIMEOUT', default=30))
+graceful_timeout = timeout
+keepalive = 5
+preload_app = os.getenv('GUNICORN_PRELOAD', default='True') == 'True'
+
+
+def on_starting(server):
+    """Сброс снимков метрик прошлого запуска и прогрев мастера после
+    загрузки приложения, до fork воркеров."""
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'foodgram.settings')
+    from foodgram.metrics import clear_snapshots
+
+    clear_snapshots()
+    if server.cfg.preload_app:
+        from django.conf import settings
+
+        from foodgram.warmup import warm_up
+
+        if server.cfg.workers > 1 and not settings.CACHE_SHARED:
+            server.log.warning(
+                'Кэш в памяти процесса при %s воркерах: кэширование '
+                'токенов, отметок и рецептов отключено (CACHE_SHARED).',
+                server.cfg.workers,
+            )
+        server.log.info('Прогрев за %.2f с.', warm_up())
+
+
+def post_worker_init(worker):
+    """Без preload_app каждый воркер прогревается сам."""
+    if not worker.cfg.preload_app:
+        from foodgram.warmup import warm_up
+
+        worker.log.info('Прогрев воркера за %.2f с.', warm_up())
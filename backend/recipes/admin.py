@@ -1,6 +1,69 @@
 from django.contrib import admin
+from django.contrib.admin.widgets import AutocompleteSelect
+from django.db import transaction
+from django.forms.models import BaseInlineFormSet
 
 from recipes import models
+from recipes.cache import invalidate_user_flags
+from recipes.shopping_cart import rebuild_cart_totals
+
+
+class LabeledAutocompleteSelect(AutocompleteSelect):
+    """Автодополнение, которое берёт подписи выбранных значений из
+    labels вместо отдельного запроса на каждую строку."""
+
+    labels = None
+
+    def optgroups(self, name, value, attr=None):
+        selected = [str(item) for item in value if item not in ('', None)]
+        if not self.labels or not set(selected) <= self.labels.keys():
+            return super().optgroups(name, value, attr)
+        options = [
+            self.create_option(name, item, self.labels[item], True, index)
+            for index, item in enumerate(selected)
+        ]
+        return [(None, options, 0)]
+
+
+class LabeledFormSet(BaseInlineFormSet):
+    """Передаёт виджетам подписи связанных объектов строк формсета."""
+
+    def _construct_form(self, i, **kwargs):
+        form = super()._construct_form(i, **kwargs)
+        for name in self.autocomplete_fields:
+            related = getattr(form.instance, name, None)
+            widget = form.fields[name].widget
+            widget = getattr(widget, 'widget', widget)
+            if related is not None and isinstance(
+                widget, LabeledAutocompleteSelect,
+            ):
+                widget.labels = {str(related.pk): str(related)}
+        return form
+
+
+class LabeledAutocompleteInline(admin.TabularInline):
+    """Строки со связанными объектами за один запрос на весь формсет."""
+
+    formset = LabeledFormSet
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related(
+            *self.autocomplete_fields
+        )
+
+    def get_formset(self, request, obj=None, **kwargs):
+        formset = super().get_formset(request, obj, **kwargs)
+        formset.autocomplete_fields = self.autocomplete_fields
+        return formset
+
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        if db_field.name in self.autocomplete_fields:
+            kwargs['widget'] = LabeledAutocompleteSelect(
+                db_field,
+                self.admin_site,
+                using=kwargs.get('using'),
+            )
+        return super().formfield_for_foreignkey(db_field, request, **kwargs)
 
 
 @admin.register(models.Tag)
@@ -8,6 +71,7 @@ class TagAdmin(admin.ModelAdmin):
     """Администрирование модели Tag."""
 
     list_display = ('id', 'name', 'slug')
+    search_fields = ('name', 'slug')
 
 
 @admin.register(models.Ingredient)
@@ -15,22 +79,24 @@ class IngredientAdmin(admin.ModelAdmin):
     """Администрирование модели Ingredient."""
 
     list_display = ('id', 'name', 'measurement_unit')
-    list_filter = ['name']
+    list_filter = ('measurement_unit',)
     search_fields = ('name',)
 
 
-class RecipeIngredientInline(admin.TabularInline):
+class RecipeIngredientInline(LabeledAutocompleteInline):
     """Администрирование модели RecipeIngredient."""
 
     model = models.RecipeIngredient
+    autocomplete_fields = ('ingredient',)
     min_num = 1
     extra = 1
 
 
-class RecipeTagInline(admin.TabularInline):
+class RecipeTagInline(LabeledAutocompleteInline):
     """Администрирование модели RecipeTag."""
 
     model = models.RecipeTag
+    autocomplete_fields = ('tag',)
     min_num = 1
     extra = 0
 
@@ -40,11 +106,24 @@ class RecipeAdmin(admin.ModelAdmin):
     """Администрирование модели Recipe."""
 
     list_display = ('id', 'name', 'author', 'in_favorite')
-    list_filter = ['name', 'author', 'tags']
+    list_select_related = ('author',)
+    list_filter = ('tags',)
+    search_fields = ('name', 'author__username')
+    autocomplete_fields = ('author',)
+    show_full_result_count = False
     inlines = (RecipeIngredientInline, RecipeTagInline)
 
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        form.instance.update_tags_mask()
+        if change:
+            rebuild_cart_totals(models.ShoppingList.objects.filter(
+                recipe=form.instance,
+            ).values('user_id'))
+
+    @admin.display(description='В избранном', ordering='favorites_count')
     def in_favorite(self, obj):
-        return obj.in_favorite.all().count()
+        return obj.favorites_count
 
 
 @admin.register(models.Favorite)
@@ -52,6 +131,28 @@ class FavoriteAdmin(admin.ModelAdmin):
     """Администрирование модели Favorite."""
 
     list_display = ('id', 'user', 'recipe')
+    list_select_related = ('user', 'recipe')
+    search_fields = ('user__username', 'recipe__name')
+    autocomplete_fields = ('user', 'recipe')
+    show_full_result_count = False
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        for user_id in {obj.user_id, form.initial.get('user')} - {None}:
+            invalidate_user_flags(user_id)
+
+    def delete_model(self, request, obj):
+        self.delete_queryset(
+            request, models.Favorite.objects.filter(pk=obj.pk),
+        )
+
+    @transaction.atomic
+    def delete_queryset(self, request, queryset):
+        users = list(queryset.values_list('user_id', flat=True).distinct())
+        models.Recipe.objects.subtract_favorites(queryset)
+        super().delete_queryset(request, queryset)
+        for user_id in users:
+            invalidate_user_flags(user_id)
 
 
 @admin.register(models.ShoppingList)
@@ -59,3 +160,26 @@ class ShoppingListAdmin(admin.ModelAdmin):
     """Администрирование модели ShoppingList."""
 
     list_display = ('id', 'user', 'recipe')
+    list_select_related = ('user', 'recipe')
+    search_fields = ('user__username', 'recipe__name')
+    autocomplete_fields = ('user', 'recipe')
+    show_full_result_count = False
+
+    def save_model(self, request, obj, form, change):
+        users = {obj.user_id, form.initial.get('user')} - {None}
+        super().save_model(request, obj, form, change)
+        rebuild_cart_totals(users)
+        for user_id in users:
+            invalidate_user_flags(user_id)
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        rebuild_cart_totals([obj.user_id])
+        invalidate_user_flags(obj.user_id)
+
+    def delete_queryset(self, request, queryset):
+        users = list(queryset.values_list('user_id', flat=True).distinct())
+        super().delete_queryset(request, queryset)
+        rebuild_cart_totals(users)
+        for user_id in users:
+            invalidate_user_flags(user_id)
@@ -0,0 +1,194 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import models, transaction
+
+INGREDIENTS_SCOPE = 'ingredients'
+TAGS_SCOPE = 'tags'
+
+FAVORITES = 'favorites'
+SHOPPING_CART = 'shopping_cart'
+FOLLOWING = 'following'
+USER_FLAGS = (FAVORITES, SHOPPING_CART, FOLLOWING)
+
+
+def _version_key(scope):
+    return f'version:{scope}'
+
+
+def get_version(scope):
+    """Текущая версия набора данных scope.
+
+    При отсутствии ключа в кэше версия заводится от текущего времени,
+    чтобы после вытеснения из кэша она не совпала ни с одной прежней.
+    Без общего кэша (CACHE_SHARED) изменение в одном воркере не меняет
+    версию в остальных, поэтому там она живёт LOCAL_VERSION_TIMEOUT
+    секунд: другие воркеры видят изменения с такой задержкой.
+    """
+
+    key = _version_key(scope)
+    version = cache.get(key)
+    if version is None:
+        cache.add(
+            key,
+            time.time_ns(),
+            timeout=(
+                None if settings.CACHE_SHARED
+                else settings.LOCAL_VERSION_TIMEOUT
+            ),
+        )
+        version = cache.get(key)
+    return version
+
+
+def bump_version(scope):
+    """Сбрасывает все закэшированные по scope данные."""
+
+    try:
+        return cache.incr(_version_key(scope))
+    except ValueError:
+        return get_version(scope)
+
+
+class ReferenceCache:
+    """Сериализованные ответы справочников в памяти процесса.
+
+    Записи привязаны к версии набора данных и вытесняются по LRU.
+    При REFERENCE_CACHE_SHARED ответы дополнительно хранятся в общем
+    кэше Django, чтобы воркеры не сериализовали их каждый заново.
+    """
+
+    def __init__(self, max_size):
+        self._lock = threading.Lock()
+        self._max_size = max_size
+        self._data = OrderedDict()
+
+    def get(self, scope, version, key):
+        with self._lock:
+            data = self._data.get((scope, version, key))
+            if data is not None:
+                self._data.move_to_end((scope, version, key))
+                return data
+        if settings.REFERENCE_CACHE_SHARED:
+            data = cache.get(f'reference:{scope}:{version}:{key}')
+            if data is not None:
+                self._store(scope, version, key, data)
+        return data
+
+    def set(self, scope, version, key, data):
+        self._store(scope, version, key, data)
+        if settings.REFERENCE_CACHE_SHARED:
+            cache.set(f'reference:{scope}:{version}:{key}', data)
+
+    def _store(self, scope, version, key, data):
+        with self._lock:
+            self._data[(scope, version, key)] = data
+            self._data.move_to_end((scope, version, key))
+            while len(self._data) > self._max_size:
+                self._data.popitem(last=False)
+
+
+reference_cache = ReferenceCache(max_size=settings.REFERENCE_CACHE_SIZE)
+
+
+def _user_flags_scope(user_id):
+    return f'user_flags:{user_id}'
+
+
+def load_user_flags(user_id):
+    """Избранное, корзина и подписки пользователя одним запросом."""
+
+    from recipes.models import Favorite, ShoppingList
+    from users.models import Follow
+
+    def ids(queryset, flag, field):
+        return queryset.filter(user_id=user_id).order_by().annotate(
+            flag=models.Value(USER_FLAGS.index(flag)),
+        ).values_list('flag', field)
+
+    rows = ids(Favorite.objects, FAVORITES, 'recipe_id').union(
+        ids(ShoppingList.objects, SHOPPING_CART, 'recipe_id'),
+        ids(Follow.objects, FOLLOWING, 'author_id'),
+        all=True,
+    )
+    flags = {flag: set() for flag in USER_FLAGS}
+    for flag, id in rows:
+        flags[USER_FLAGS[flag]].add(id)
+    return flags
+
+
+def get_user_flags(user_id):
+    """Множества id рецептов в избранном и корзине и id авторов,
+    на которых подписан пользователь.
+
+    Отметки хранятся под версией пользователя. Без общего кэша
+    (CACHE_SHARED) сброс в одном воркере не виден остальным, поэтому
+    отметки читаются из базы на каждый запрос."""
+
+    if not settings.CACHE_SHARED:
+        return load_user_flags(user_id)
+    scope = _user_flags_scope(user_id)
+    key = f'{scope}:{get_version(scope)}'
+    flags = cache.get(key)
+    if flags is None:
+        flags = load_user_flags(user_id)
+        cache.set(key, flags, settings.USER_FLAGS_CACHE_TIMEOUT)
+    return flags
+
+
+def invalidate_user_flags(user_id):
+    """Сброс отметок пользователя после фиксации транзакции.
+
+    Запрос, прочитавший базу до фиксации, положит отметки под старой
+    версией, и их больше никто не прочитает."""
+
+    transaction.on_commit(lambda: bump_version(_user_flags_scope(user_id)))
+
+
+def get_tag_ids_by_slug():
+    """Словарь slug -> id тегов, живущий до изменения тегов."""
+
+    from recipes.models import Tag
+
+    version = get_version(TAGS_SCOPE)
+    tag_ids = reference_cache.get(TAGS_SCOPE, version, 'ids_by_slug')
+    if tag_ids is None:
+        tag_ids = dict(Tag.objects.values_list('slug', 'id'))
+        reference_cache.set(TAGS_SCOPE, version, 'ids_by_slug', tag_ids)
+    return tag_ids
+
+
+def get_recipe_payload_keys(recipe_ids):
+    """Ключи кэша рецептов; версии справочников входят в ключ,
+    поэтому правка тега или ингредиента сбрасывает все рецепты."""
+
+    prefix = (
+        f'recipe_payload:{get_version(TAGS_SCOPE)}:'
+        f'{get_version(INGREDIENTS_SCOPE)}'
+    )
+    return {recipe_id: f'{prefix}:{recipe_id}' for recipe_id in recipe_ids}
+
+
+def get_author_payload_keys(author_ids):
+    return {
+        author_id: f'author_payload:{author_id}' for author_id in author_ids
+    }
+
+
+def _delete_on_commit(keys):
+    """Удаление сейчас и ещё раз после фиксации транзакции: иначе
+    параллельный запрос успеет положить в кэш старые данные."""
+
+    cache.delete_many(keys)
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def invalidate_recipe_payloads(recipe_ids):
+    _delete_on_commit(list(get_recipe_payload_keys(recipe_ids).values()))
+
+
+def invalidate_author_payloads(author_ids):
+    _delete_on_commit(list(get_author_payload_keys(author_ids).values()))
@@ -0,0 +1,49 @@
+from django.conf import settings
+
+from recipes.models import FeedItem, Recipe
+from users.models import Follow
+
+
+def _insert(items):
+    FeedItem.objects.bulk_create(items, ignore_conflicts=True)
+
+
+def fan_out_recipe(recipe):
+    """Добавление нового рецепта в ленты всех подписчиков автора."""
+
+    follower_ids = Follow.objects.filter(
+        author_id=recipe.author_id,
+    ).order_by().values_list('user_id', flat=True)
+    batch = []
+    for user_id in follower_ids.iterator():
+        batch.append(FeedItem(
+            user_id=user_id,
+            recipe_id=recipe.id,
+            author_id=recipe.author_id,
+        ))
+        if len(batch) >= settings.FEED_BATCH_SIZE:
+            _insert(batch)
+            batch = []
+    _insert(batch)
+
+
+def backfill_feed(user_id, author_id):
+    """Последние рецепты автора в ленту нового подписчика."""
+
+    recipe_ids = Recipe.objects.filter(author_id=author_id).order_by(
+        '-id',
+    ).values_list('id', flat=True)[:settings.FEED_BACKFILL_LIMIT]
+    FeedItem.objects.bulk_create(
+        [
+            FeedItem(user_id=user_id, recipe_id=recipe_id, author_id=author_id)
+            for recipe_id in recipe_ids
+        ],
+        batch_size=settings.FEED_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def trim_feed(user_id, author_id):
+    """Удаление рецептов автора из ленты отписавшегося пользователя."""
+
+    FeedItem.objects.filter(user_id=user_id, author_id=author_id).delete()
@@ -0,0 +1,148 @@
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connections, transaction
+from PIL import Image, features
+
+from recipes.cache import invalidate_recipe_payloads
+from recipes.models import Recipe
+
+logger = logging.getLogger(__name__)
+
+VARIANTS_DIR = 'recipes/variants'
+
+# Имя варианта: (размер, формат Pillow, расширение файла).
+VARIANTS = {
+    'thumbnail': (settings.IMAGE_THUMBNAIL_SIZE, 'JPEG', 'jpg'),
+    'webp': (settings.IMAGE_WEBP_SIZE, 'WEBP', 'webp'),
+}
+
+_executor = ThreadPoolExecutor(
+    max_workers=settings.IMAGE_VARIANTS_WORKERS,
+    thread_name_prefix='image-variants',
+)
+
+
+def get_supported_variants():
+    return [
+        variant for variant, (_, image_format, _) in VARIANTS.items()
+        if image_format != 'WEBP' or features.check('webp')
+    ]
+
+
+def get_variant_name(image_name, variant):
+    """Путь варианта изображения относительно MEDIA_ROOT."""
+    stem = os.path.splitext(os.path.basename(image_name))[0]
+    extension = VARIANTS[variant][2]
+    return f'{VARIANTS_DIR}/{stem}_{variant}.{extension}'
+
+
+def get_expected_variants(image_name):
+    """Варианты, которые должны быть у изображения: {вариант: путь}."""
+    return {
+        variant: get_variant_name(image_name, variant)
+        for variant in get_supported_variants()
+    }
+
+
+def get_variant_targets(image_name, force=False):
+    """Варианты, которые нужно построить: (путь, размер, формат)."""
+    targets = []
+    for variant, name in get_expected_variants(image_name).items():
+        if force or not default_storage.exists(name):
+            size, image_format, _ = VARIANTS[variant]
+            targets.append((name, size, image_format))
+    return targets
+
+
+def make_variants(content, targets):
+    """Построение уменьшенных копий изображения по содержимому
+    исходного файла: [(путь, содержимое копии)].
+
+    Не обращается к Django, поэтому годится для пула процессов.
+    """
+    variants = []
+    with Image.open(BytesIO(content)) as image:
+        image.load()
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if 'A' in image.getbands() else 'RGB')
+        for name, size, image_format in targets:
+            variant = image.copy()
+            variant.thumbnail(size)
+            if image_format == 'JPEG' and variant.mode == 'RGBA':
+                variant = variant.convert('RGB')
+            output = BytesIO()
+            variant.save(output, image_format, quality=80)
+            variants.append((name, output.getvalue()))
+    return variants
+
+
+def save_variants(variants):
+    """Запись копий в хранилище поверх прежних."""
+    for name, content in variants:
+        default_storage.delete(name)
+        default_storage.save(name, ContentFile(content))
+    return len(variants)
+
+
+def record_variants(image_name):
+    """Отметка готовых вариантов в рецептах с этим изображением и
+    сброс их кэша: при выдаче адреса строятся без обращения к
+    хранилищу."""
+    recipe_ids = list(Recipe.objects.filter(image=image_name).values_list(
+        'id', flat=True,
+    ))
+    Recipe.objects.filter(id__in=recipe_ids).update(
+        image_variants=get_expected_variants(image_name),
+    )
+    invalidate_recipe_payloads(recipe_ids)
+
+
+def generate_variants(image_name, force=False):
+    targets = get_variant_targets(image_name, force)
+    if targets:
+        with default_storage.open(image_name) as source:
+            save_variants(make_variants(source.read(), targets))
+    record_variants(image_name)
+
+
+def _generate_in_background(image_name):
+    try:
+        generate_variants(image_name)
+    except (OSError, ValueError):
+        logger.exception('Не удалось построить варианты %s', image_name)
+    finally:
+        connections.close_all()
+
+
+def schedule_variants(recipe):
+    """Построение вариантов в фоне после фиксации транзакции, если
+    для текущего изображения рецепта они ещё не отмечены."""
+    image_name = recipe.image.name
+    if not image_name or (
+        recipe.image_variants == get_expected_variants(image_name)
+    ):
+        return
+    transaction.on_commit(
+        lambda: _executor.submit(_generate_in_background, image_name)
+    )
+
+
+def get_variant_urls(image_name, recorded):
+    """Адреса готовых вариантов изображения; None, пока их нет.
+
+    recorded — отмеченные в рецепте варианты (Recipe.image_variants):
+    запись для прежнего изображения не совпадёт по пути."""
+    urls = {}
+    for variant in VARIANTS:
+        name = get_variant_name(image_name, variant)
+        urls[variant] = (
+            default_storage.url(name)
+            if image_name and recorded.get(variant) == name else None
+        )
+    return urls
@@ -0,0 +1,93 @@
+import threading
+from bisect import bisect_left, bisect_right
+
+from recipes.cache import INGREDIENTS_SCOPE, get_version
+
+
+def fold(value):
+    """Приведение строки к виду для сравнения: без регистра, ё = е."""
+
+    return value.casefold().replace('ё', 'е')
+
+
+class IngredientIndex:
+    """Индекс ингредиентов в памяти процесса для автодополнения.
+
+    Строится при первом обращении и перестраивается, когда меняется
+    версия ингредиентов в кэше (см. recipes.signals).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._keys = ()
+        self._items = ()
+        self._text = ''
+        self._offsets = ()
+
+    def _load(self):
+        from recipes.models import Ingredient
+
+        rows = sorted(
+            (fold(name), name, measurement_unit, id)
+            for id, name, measurement_unit in Ingredient.objects.values_list(
+                'id', 'name', 'measurement_unit',
+            )
+        )
+        keys = tuple(row[0] for row in rows)
+        items = tuple(
+            {'id': id, 'name': name, 'measurement_unit': measurement_unit}
+            for _, name, measurement_unit, id in rows
+        )
+        return keys, items
+
+    def _build(self):
+        keys, items = self._load()
+        # Все названия одной строкой: поиск подстроки идёт через str.find,
+        # а номер ингредиента находится по смещениям начала названий.
+        offsets = []
+        position = 0
+        for key in keys:
+            offsets.append(position)
+            position += len(key) + 1
+        self._keys, self._items = keys, items
+        self._text = '\n'.join(keys)
+        self._offsets = tuple(offsets)
+
+    def _actualize(self):
+        version = get_version(INGREDIENTS_SCOPE)
+        if version == self._version:
+            return
+        with self._lock:
+            if version == self._version:
+                return
+            self._build()
+            self._version = version
+
+    def search(self, query):
+        """Ингредиенты, название которых начинается с query, а за ними
+        те, в названии которых query встречается."""
+
+        self._actualize()
+        keys, items = self._keys, self._items
+        text, offsets = self._text, self._offsets
+        query = fold(query.strip())
+        if not query:
+            return list(items)
+        index = bisect_left(keys, query)
+        found = []
+        while index < len(keys) and keys[index].startswith(query):
+            found.append(items[index])
+            index += 1
+        position = text.find(query)
+        while position != -1:
+            index = bisect_right(offsets, position) - 1
+            if position != offsets[index]:
+                found.append(items[index])
+            if index + 1 == len(offsets):
+                break
+            position = text.find(query, offsets[index + 1])
+        return found
+
+
+ingredient_index = IngredientIndex()
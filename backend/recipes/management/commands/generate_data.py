@@ -0,0 +1,296 @@
+import io
+import itertools
+import random
+
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from recipes.models import (
+    Favorite,
+    FeedItem,
+    Ingredient,
+    Recipe,
+    RecipeIngredient,
+    RecipeTag,
+    ShoppingList,
+    Tag,
+    get_tags_mask,
+)
+from recipes.search import rebuild_index
+from users.models import Follow, User
+
+DEFAULT_TAGS = (
+    ('Завтрак', '#E26C2D', 'breakfast'),
+    ('Обед', '#49B64E', 'lunch'),
+    ('Ужин', '#8775D2', 'dinner'),
+)
+DISHES = (
+    'Суп', 'Салат', 'Пирог', 'Омлет', 'Рагу', 'Плов', 'Запеканка',
+    'Каша', 'Паста', 'Борщ', 'Котлеты', 'Блины', 'Сырники', 'Жаркое',
+)
+STYLES = (
+    'по-домашнему', 'с грибами', 'с курицей', 'овощной', 'с сыром',
+    'быстрый', 'праздничный', 'с зеленью', 'по-деревенски', 'острый',
+    'с ягодами', 'постный', 'бабушкин', 'с говядиной', 'летний',
+)
+FEED_SQL = '''
+    INSERT INTO {feed} (user_id, recipe_id, author_id)
+    SELECT follow.user_id, recipe.id, recipe.author_id
+    FROM {follow} follow
+    JOIN (
+        SELECT id, author_id, ROW_NUMBER() OVER (
+            PARTITION BY author_id ORDER BY id DESC
+        ) AS row_number
+        FROM {recipe}
+    ) recipe ON recipe.author_id = follow.author_id
+    WHERE follow.user_id > %s AND recipe.row_number <= %s
+'''
+
+
+def power_law_weights(count, alpha):
+    """Накопленные веса рангов 1..count, пропорциональные 1 / rank^alpha.
+
+    alpha = 0 даёт равномерное распределение."""
+    return list(itertools.accumulate(
+        1 / rank ** alpha for rank in range(1, count + 1)
+    ))
+
+
+def bulk_insert(model, objs, batch_size, **kwargs):
+    """Запись генератора объектов пачками без накопления в памяти."""
+    objs = iter(objs)
+    total = 0
+    while True:
+        batch = list(itertools.islice(objs, batch_size))
+        if not batch:
+            return total
+        model.objects.bulk_create(batch, **kwargs)
+        total += len(batch)
+
+
+class Generator:
+    """Синтетические данные для нагрузочного тестирования.
+
+    Популярность авторов, рецептов и ингредиентов подчиняется
+    степенному закону с показателем alpha, поэтому несколько авторов
+    собирают большую часть подписок, а соль встречается чаще шафрана."""
+
+    def __init__(self, options):
+        self.options = options
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+
+    def pick(self, population, weights, count):
+        """count различных элементов population с весами weights."""
+        count = min(count, len(population))
+        chosen = set()
+        while len(chosen) < count:
+            chosen.update(self.rng.choices(
+                population, cum_weights=weights, k=count - len(chosen),
+            ))
+        return chosen
+
+    def amount(self, mean):
+        """Случайное количество около mean, от 0 до 3 * mean."""
+        if mean <= 0:
+            return 0
+        return min(round(self.rng.expovariate(1 / mean)), 3 * mean)
+
+    def users(self):
+        start = User.objects.order_by('-id').values_list(
+            'id', flat=True,
+        ).first() or 0
+        prefix = self.options['prefix']
+        password = make_password(self.options['password'])
+        bulk_insert(User, (
+            User(
+                email=f'{prefix}{start + number}@example.com',
+                username=f'{prefix}{start + number}',
+                first_name='Имя',
+                last_name='Фамилия',
+                password=password,
+            )
+            for number in range(1, self.options['users'] + 1)
+        ), self.batch_size)
+        self.first_user_id = start
+        return list(User.objects.filter(id__gt=start).values_list(
+            'id', flat=True,
+        ))
+
+    def tags(self):
+        if not Tag.objects.exists():
+            Tag.objects.bulk_create([
+                Tag(name=name, color=color, slug=slug)
+                for name, color, slug in DEFAULT_TAGS
+            ])
+        return list(Tag.objects.values_list('id', flat=True))
+
+    def ingredients(self):
+        if not Ingredient.objects.exists():
+            call_command('load_ingredients', stdout=io.StringIO())
+        ingredient_ids = list(Ingredient.objects.values_list('id', flat=True))
+        if not ingredient_ids:
+            raise CommandError('Каталог ингредиентов пуст.')
+        self.rng.shuffle(ingredient_ids)
+        return ingredient_ids
+
+    def recipes(self, author_ids, tag_ids):
+        alpha = self.options['alpha']
+        author_weights = power_law_weights(len(author_ids), alpha)
+        start = Recipe.objects.order_by('-id').values_list(
+            'id', flat=True,
+        ).first() or 0
+        recipe_tags = []
+
+        def build():
+            for number in range(1, self.options['recipes'] + 1):
+                tags = self.rng.sample(
+                    tag_ids, self.rng.randint(1, min(3, len(tag_ids))),
+                )
+                recipe_tags.append(tags)
+                yield Recipe(
+                    author_id=self.rng.choices(
+                        author_ids, cum_weights=author_weights,
+                    )[0],
+                    name=(
+                        f'{self.rng.choice(DISHES)} '
+                        f'{self.rng.choice(STYLES)} {start + number}'
+                    ),
+                    text='Смешать все ингредиенты и запечь до готовности.',
+                    image=self.options['image'],
+                    cooking_time=self.rng.randint(5, 180),
+                    tags_mask=get_tags_mask(tags),
+                )
+
+        bulk_insert(Recipe, build(), self.batch_size)
+        recipe_ids = list(Recipe.objects.filter(id__gt=start).order_by(
+            'id',
+        ).values_list('id', flat=True))
+        bulk_insert(RecipeTag, (
+            RecipeTag(recipe_id=recipe_id, tag_id=tag_id)
+            for recipe_id, tags in zip(recipe_ids, recipe_tags)
+            for tag_id in tags
+        ), self.batch_size)
+        return recipe_ids
+
+    def recipe_ingredients(self, recipe_ids, ingredient_ids):
+        weights = power_law_weights(len(ingredient_ids), self.options['alpha'])
+        mean = self.options['ingredients']
+        return bulk_insert(RecipeIngredient, (
+            RecipeIngredient(
+                recipe_id=recipe_id,
+                ingredient_id=ingredient_id,
+                amount=self.rng.randint(1, 500),
+            )
+            for recipe_id in recipe_ids
+            for ingredient_id in self.pick(
+                ingredient_ids, weights, max(1, self.amount(mean)),
+            )
+        ), self.batch_size)
+
+    def relations(self, model, field, user_ids, target_ids, mean):
+        """Подписки, избранное или корзина каждого пользователя."""
+        weights = power_law_weights(len(target_ids), self.options['alpha'])
+        return bulk_insert(model, (
+            model(user_id=user_id, **{field: target_id})
+            for user_id in user_ids
+            for target_id in self.pick(
+                target_ids, weights, self.amount(mean),
+            )
+            if model is not Follow or target_id != user_id
+        ), self.batch_size, ignore_conflicts=True)
+
+    def feed(self):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                FEED_SQL.format(
+                    feed=FeedItem._meta.db_table,
+                    follow=Follow._meta.db_table,
+                    recipe=Recipe._meta.db_table,
+                ),
+                [self.first_user_id, self.options['feed_limit']],
+            )
+            return cursor.rowcount
+
+    def generate(self):
+        user_ids = self.users()
+        tag_ids = self.tags()
+        ingredient_ids = self.ingredients()
+        recipe_ids = self.recipes(user_ids, tag_ids)
+        counts = {
+            'users': len(user_ids),
+            'recipes': len(recipe_ids),
+            'ingredients': self.recipe_ingredients(recipe_ids, ingredient_ids),
+            'follows': self.relations(
+                Follow, 'author_id', user_ids, user_ids,
+                self.options['follows'],
+            ),
+            'favorites': self.relations(
+                Favorite, 'recipe_id', user_ids, recipe_ids,
+                self.options['favorites'],
+            ),
+            'cart': self.relations(
+                ShoppingList, 'recipe_id', user_ids, recipe_ids,
+                self.options['cart'],
+            ),
+        }
+        counts['feed'] = self.feed()
+        call_command('recount', stdout=io.StringIO())
+        rebuild_index()
+        return counts
+
+
+class Command(BaseCommand):
+    help = (
+        'Генерация пользователей, рецептов, подписок, избранного '
+        'и корзин для нагрузочного тестирования.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--recipes', type=int, default=10000)
+        parser.add_argument(
+            '--ingredients',
+            type=int,
+            default=8,
+            help='Среднее число ингредиентов в рецепте.',
+        )
+        parser.add_argument(
+            '--follows',
+            type=int,
+            default=20,
+            help='Среднее число подписок пользователя.',
+        )
+        parser.add_argument(
+            '--favorites',
+            type=int,
+            default=30,
+            help='Среднее число рецептов в избранном.',
+        )
+        parser.add_argument(
+            '--cart',
+            type=int,
+            default=5,
+            help='Среднее число рецептов в корзине.',
+        )
+        parser.add_argument(
+            '--alpha',
+            type=float,
+            default=1.0,
+            help='Показатель степенного закона популярности, 0 - равномерно.',
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--prefix', default='loadtest')
+        parser.add_argument('--password', default='loadtest')
+        parser.add_argument('--image', default='recipes/loadtest.png')
+        parser.add_argument('--feed-limit', type=int, default=1000)
+
+    @transaction.atomic
+    def handle(self, *args, **options):
+        counts = Generator(options).generate()
+        self.stdout.write(self.style.SUCCESS(', '.join(
+            f'{name}: {count}' for name, count in counts.items()
+        )))
@@ -0,0 +1,71 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+
+from recipes.images import (
+    get_variant_targets,
+    make_variants,
+    record_variants,
+    save_variants,
+)
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = 'Построение уменьшенных копий изображений всех рецептов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count(),
+            help='Количество процессов.',
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Перестроить и уже существующие копии.',
+        )
+
+    def handle(self, *args, **options):
+        jobs = {}
+        image_names = Recipe.objects.exclude(image='').order_by().values_list(
+            'image', flat=True,
+        ).distinct()
+        for image_name in image_names.iterator():
+            if not default_storage.exists(image_name):
+                self.stderr.write(f'Нет файла {image_name}')
+                continue
+            jobs[image_name] = get_variant_targets(
+                image_name, options['force'],
+            )
+        created = failed = 0
+        # Исходники читаются пачками, чтобы не держать в памяти все сразу.
+        batch_size = options['workers'] * 4
+        pending = list(jobs.items())
+        with ProcessPoolExecutor(max_workers=options['workers']) as executor:
+            for start in range(0, len(pending), batch_size):
+                futures = {}
+                for image_name, targets in pending[start:start + batch_size]:
+                    if not targets:
+                        record_variants(image_name)
+                        continue
+                    with default_storage.open(image_name) as source:
+                        futures[executor.submit(
+                            make_variants, source.read(), targets,
+                        )] = image_name
+                for future in as_completed(futures):
+                    image_name = futures[future]
+                    try:
+                        created += save_variants(future.result())
+                    except (OSError, ValueError) as error:
+                        failed += 1
+                        self.stderr.write(f'{image_name}: {error}')
+                    else:
+                        record_variants(image_name)
+        self.stdout.write(self.style.SUCCESS(
+            f'Изображений: {len(jobs)}, создано копий: {created}, '
+            f'ошибок: {failed}.'
+        ))
@@ -0,0 +1,138 @@
+import csv
+import json
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from recipes.cache import INGREDIENTS_SCOPE, bump_version
+from recipes.models import Ingredient
+
+DEFAULT_PATH = Path(__file__).resolve().parents[4] / 'data' / 'ingredients.csv'
+BATCH_SIZE = 1000
+CHUNK_SIZE = 64 * 1024
+
+
+def read_csv(path):
+    with open(path, encoding='utf-8', newline='') as file:
+        for row in csv.DictReader(file):
+            yield row['name'], row['measurement_unit']
+
+
+def _peek(file, buffer, position, chunk_size):
+    """Первый непробельный символ с позиции position; пустая строка -
+    конец файла."""
+    while True:
+        while position < len(buffer) and buffer[position].isspace():
+            position += 1
+        if position < len(buffer):
+            return buffer, position, buffer[position]
+        buffer, position = file.read(chunk_size), 0
+        if not buffer:
+            return buffer, position, ''
+
+
+def _decode(file, decoder, buffer, position, chunk_size):
+    """Значение с позиции position; файл дочитывается, пока значение
+    не разобрано целиком."""
+    chunk = None
+    while True:
+        try:
+            value, end = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            if chunk == '':
+                raise
+            end = len(buffer)
+        # Число в конце куска могло прерваться на середине.
+        if end < len(buffer) or chunk == '':
+            return value, buffer, end
+        chunk = file.read(chunk_size)
+        buffer, position = buffer[position:] + chunk, 0
+
+
+def iter_json_array(file, chunk_size=CHUNK_SIZE):
+    """Элементы JSON-массива верхнего уровня по одному: файл читается
+    кусками, в памяти держится только текущий кусок."""
+    decoder = json.JSONDecoder()
+    buffer, position, char = _peek(file, '', 0, chunk_size)
+    if char != '[':
+        raise ValueError('Ожидается массив JSON.')
+    buffer, position, char = _peek(file, buffer, position + 1, chunk_size)
+    while char != ']':
+        if not char:
+            raise ValueError('Массив JSON не закрыт.')
+        value, buffer, position = _decode(
+            file, decoder, buffer, position, chunk_size,
+        )
+        yield value
+        buffer, position, char = _peek(file, buffer, position, chunk_size)
+        if char == ',':
+            buffer, position, char = _peek(
+                file, buffer, position + 1, chunk_size,
+            )
+            if char == ']':
+                raise ValueError('Лишняя запятая в конце массива JSON.')
+        elif char and char != ']':
+            raise ValueError('Ожидается запятая между элементами.')
+
+
+def read_json(path):
+    with open(path, encoding='utf-8') as file:
+        for row in iter_json_array(file):
+            yield row['name'], row['measurement_unit']
+
+
+READERS = {'.csv': read_csv, '.json': read_json}
+
+
+class Command(BaseCommand):
+    help = 'Загрузка ингредиентов из data/ingredients.csv или .json.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path',
+            nargs='?',
+            default=str(DEFAULT_PATH),
+            help='Путь к файлу .csv или .json.',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=BATCH_SIZE,
+            help='Количество строк в одном INSERT.',
+        )
+
+    def insert(self, batch):
+        Ingredient.objects.bulk_create(batch, ignore_conflicts=True)
+
+    def handle(self, *args, **options):
+        path = Path(options['path'])
+        reader = READERS.get(path.suffix.lower())
+        if reader is None:
+            raise CommandError('Поддерживаются только файлы .csv и .json.')
+        if not path.exists():
+            raise CommandError(f'Файл {path} не найден.')
+        existing = set(
+            Ingredient.objects.values_list('name', 'measurement_unit')
+        )
+        before = len(existing)
+        total = 0
+        batch = []
+        with transaction.atomic():
+            for name, measurement_unit in reader(path):
+                total += 1
+                key = (name.strip(), measurement_unit.strip())
+                if key in existing:
+                    continue
+                existing.add(key)
+                batch.append(Ingredient(name=key[0], measurement_unit=key[1]))
+                if len(batch) >= options['batch_size']:
+                    self.insert(batch)
+                    batch = []
+            self.insert(batch)
+        inserted = Ingredient.objects.count() - before
+        if inserted:
+            bump_version(INGREDIENTS_SCOPE)
+        self.stdout.write(self.style.SUCCESS(
+            f'Добавлено: {inserted}, пропущено: {total - inserted}.'
+        ))
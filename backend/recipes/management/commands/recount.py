@@ -0,0 +1,52 @@
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from recipes.models import Favorite, Recipe, User
+from recipes.shopping_cart import rebuild_cart_totals
+
+
+def count_of(queryset, field):
+    """Подзапрос количества строк queryset для каждого значения field."""
+    return Coalesce(
+        Subquery(
+            queryset.filter(**{field: OuterRef('pk')}).order_by().values(
+                field,
+            ).annotate(total=Count('pk')).values('total')
+        ),
+        0,
+    )
+
+
+def recount(model, counter, actual):
+    """Исправление расходящихся счётчиков; возвращает их количество."""
+    drifted = list(model.objects.annotate(actual=actual).exclude(
+        **{counter: F('actual')}
+    ).values_list('pk', flat=True))
+    model.objects.filter(pk__in=drifted).update(**{counter: actual})
+    return len(drifted)
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчёт счётчиков favorites_count и recipes_count '
+        'и итогов списков покупок.'
+    )
+
+    @transaction.atomic
+    def handle(self, *args, **options):
+        favorites = recount(
+            Recipe,
+            'favorites_count',
+            count_of(Favorite.objects, 'recipe'),
+        )
+        recipes = recount(
+            User,
+            'recipes_count',
+            count_of(Recipe.objects, 'author'),
+        )
+        rebuild_cart_totals()
+        self.stdout.write(self.style.SUCCESS(
+            f'Исправлено рецептов: {favorites}, пользователей: {recipes}.'
+        ))
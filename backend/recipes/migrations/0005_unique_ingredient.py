@@ -0,0 +1,33 @@
+# Generated by Django 3.2.6 on 2026-10-18 19:07
+
+from django.db import migrations, models
+
+
+def merge_duplicates(apps, schema_editor):
+    Ingredient = apps.get_model('recipes', 'Ingredient')
+    RecipeIngredient = apps.get_model('recipes', 'RecipeIngredient')
+    first_ids = {}
+    for ingredient in Ingredient.objects.order_by('id'):
+        key = (ingredient.name, ingredient.measurement_unit)
+        if key not in first_ids:
+            first_ids[key] = ingredient.id
+            continue
+        RecipeIngredient.objects.filter(ingredient_id=ingredient.id).update(
+            ingredient_id=first_ids[key],
+        )
+        ingredient.delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0004_auto_20230429_1615'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='ingredient',
+            constraint=models.UniqueConstraint(fields=('name', 'measurement_unit'), name='unique_ingredient_measurement_unit'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+from django.db import migrations
+
+POSTGRESQL_FORWARD = (
+    'CREATE FUNCTION recipes_tag_ids(mask bigint) RETURNS integer[] '
+    'LANGUAGE sql IMMUTABLE PARALLEL SAFE AS $$ '
+    "SELECT coalesce(array_agg(bit ORDER BY bit), '{}') "
+    'FROM generate_series(1, 63) AS bit '
+    'WHERE mask & (1::bigint << (bit - 1)) <> 0 $$',
+    'ALTER TABLE recipes_recipe ADD COLUMN tag_ids integer[] '
+    'GENERATED ALWAYS AS (recipes_tag_ids(tags_mask)) STORED',
+    'CREATE INDEX recipes_recipe_tag_ids_idx ON recipes_recipe '
+    'USING gin (tag_ids)',
+)
+POSTGRESQL_BACKWARD = (
+    'DROP INDEX IF EXISTS recipes_recipe_tag_ids_idx',
+    'ALTER TABLE recipes_recipe DROP COLUMN IF EXISTS tag_ids',
+    'DROP FUNCTION IF EXISTS recipes_tag_ids(bigint)',
+)
+
+
+def run(statements):
+    def operation(apps, schema_editor):
+        for statement in statements.get(schema_editor.connection.vendor, ()):
+            schema_editor.execute(statement)
+    return operation
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0011_recipe_image_variants'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            run({'postgresql': POSTGRESQL_FORWARD}),
+            run({'postgresql': POSTGRESQL_BACKWARD}),
+        ),
+    ]
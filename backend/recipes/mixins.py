@@ -1,9 +1,78 @@
-from rest_framework import mixins, viewsets
+from hashlib import md5
+
+from django.utils.http import parse_etags
+from rest_framework import mixins, status, viewsets
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.response import Response
+
+from foodgram.db_router import (
+    is_pinned_to_primary,
+    is_replica_configured,
+    primary_reads,
+    replica_reads,
+)
+from recipes.cache import get_version, reference_cache
+
+
+class ReplicaReadMixin:
+    """Безопасные запросы читают с реплики (foodgram.db_router).
+
+    Переключение происходит после аутентификации и проверки прав,
+    поэтому токен только что вошедшего пользователя ищется в основной
+    базе. Недавно писавший пользователь читает с основной базы.
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        token = replica_reads.set(False)
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        finally:
+            replica_reads.reset(token)
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if (
+            is_replica_configured()
+            and request.method in SAFE_METHODS
+            and not is_pinned_to_primary(request.user)
+        ):
+            replica_reads.set(True)
 
 
 class RetriveAndListViewSet(
+    ReplicaReadMixin,
     mixins.RetrieveModelMixin,
     mixins.ListModelMixin,
     viewsets.GenericViewSet,
 ):
     pass
+
+
+class CachedListMixin:
+    """Кэширование списка справочника с поддержкой If-None-Match.
+
+    Ответ хранится в памяти процесса, пока не изменится версия
+    cache_scope, а ETag строится из версии и строки запроса.
+    """
+
+    cache_scope = None
+
+    def get_list_data(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs).data
+
+    def list(self, request, *args, **kwargs):
+        version = get_version(self.cache_scope)
+        key = md5(request.get_full_path().encode()).hexdigest()
+        etag = f'"{self.cache_scope}-{version}-{key[:12]}"'
+        if_none_match = parse_etags(request.META.get('HTTP_IF_NONE_MATCH', ''))
+        if etag in if_none_match or '*' in if_none_match:
+            return Response(
+                status=status.HTTP_304_NOT_MODIFIED,
+                headers={'ETag': etag},
+            )
+        data = reference_cache.get(self.cache_scope, version, key)
+        if data is None:
+            with primary_reads():
+                data = self.get_list_data(request, *args, **kwargs)
+            reference_cache.set(self.cache_scope, version, key, data)
+        return Response(data, headers={'ETag': etag})
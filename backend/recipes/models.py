@@ -1,12 +1,25 @@
 
 from django.contrib.auth import get_user_model
 from django.core.validators import MaxValueValidator, MinValueValidator
-from django.db import models
+from django.db import connection, connections, models
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Coalesce, Greatest
 
 from foodgram.settings import TWO
 
 User = get_user_model()
 
+TAGS_MASK_BITS = 63
+
+
+def get_tags_mask(tag_ids):
+    """Битовая маска тегов: бит tag_id - 1 для тегов с id до 63."""
+    mask = 0
+    for tag_id in tag_ids:
+        if 0 < tag_id <= TAGS_MASK_BITS:
+            mask |= 1 << (tag_id - 1)
+    return mask
+
 
 class Ingredient(models.Model):
     """Модель ингредиентов."""
@@ -21,6 +34,10 @@ class Ingredient(models.Model):
     )
 
     class Meta:
+        constraints = [models.UniqueConstraint(
+            fields=['name', 'measurement_unit'],
+            name='unique_ingredient_measurement_unit',
+        )]
         ordering = ('name',)
         verbose_name = 'Ингредиент'
         verbose_name_plural = 'Ингредиенты'
@@ -57,6 +74,74 @@ class Tag(models.Model):
         return self.name
 
 
+class RecipeQuerySet(models.QuerySet):
+    """Запросы к рецептам с заранее подготовленными данными для выдачи."""
+
+    def with_any_tag(self, tag_ids):
+        """Рецепты хотя бы с одним из тегов, без JOIN и DISTINCT.
+
+        В PostgreSQL условие - пересечение массива tag_ids, который
+        строится из маски (миграция 0012), с GIN-индексом; в SQLite -
+        проверка битов маски."""
+        in_mask = [id for id in tag_ids if 0 < id <= TAGS_MASK_BITS]
+        overflow = [id for id in tag_ids if id > TAGS_MASK_BITS]
+        condition = models.Q(pk__in=[])
+        queryset = self
+        if in_mask and connections[self.db].vendor == 'postgresql':
+            condition = models.Q(RawSQL(
+                '"recipes_recipe"."tag_ids" && %s::integer[]',
+                [in_mask],
+                output_field=models.BooleanField(),
+            ))
+        elif in_mask:
+            condition = models.Q(tags_hit__gt=0)
+            queryset = self.annotate(
+                tags_hit=models.F('tags_mask').bitand(
+                    get_tags_mask(in_mask),
+                ),
+            )
+        if overflow:
+            condition |= models.Q(id__in=RecipeTag.objects.filter(
+                tag_id__in=overflow,
+            ).values('recipe_id'))
+        return queryset.filter(condition)
+
+    def subtract_favorites(self, favorites):
+        """Вычитание строк Favorite favorites из счётчиков избранного;
+        вызывается до удаления этих строк."""
+        count = favorites.filter(recipe_id=models.OuterRef('pk')).order_by(
+        ).values('recipe_id').annotate(
+            total=models.Count('id'),
+        ).values('total')
+        return self.filter(
+            id__in=favorites.order_by().values('recipe_id'),
+        ).update(favorites_count=Greatest(
+            models.F('favorites_count') - Coalesce(
+                models.Subquery(count), 0,
+            ),
+            0,
+        ))
+
+    def previews(self, author_ids, limit):
+        """Последние limit рецептов каждого автора одним оконным запросом."""
+        if not author_ids:
+            return []
+        table = connection.ops.quote_name(self.model._meta.db_table)
+        placeholders = ', '.join(['%s'] * len(author_ids))
+        return self.raw(
+            'SELECT id, author_id, name, image, image_variants,'
+            '    cooking_time FROM ('
+            '    SELECT id, author_id, name, image, image_variants,'
+            '        cooking_time,'
+            '        ROW_NUMBER() OVER ('
+            '            PARTITION BY author_id ORDER BY id DESC'
+            '        ) AS row_number'
+            f'    FROM {table} WHERE author_id IN ({placeholders})'
+            ') AS previews WHERE row_number <= %s ORDER BY id DESC',
+            [*author_ids, limit],
+        )
+
+
 class Recipe(models.Model):
     """Модель рецептов."""
 
@@ -96,6 +181,24 @@ class Recipe(models.Model):
         ],
         verbose_name='Время приготовления в минутах',
     )
+    tags_mask = models.BigIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Битовая маска тегов',
+    )
+    favorites_count = models.PositiveIntegerField(
+        default=0,
+        db_index=True,
+        editable=False,
+        verbose_name='В избранном',
+    )
+    image_variants = models.JSONField(
+        default=dict,
+        editable=False,
+        verbose_name='Готовые копии изображения',
+    )
+
+    objects = RecipeQuerySet.as_manager()
 
     class Meta:
         ordering = ('-id',)
@@ -105,6 +208,15 @@ class Recipe(models.Model):
     def __str__(self):
         return self.name[:TWO]
 
+    def update_tags_mask(self):
+        """Пересчёт маски тегов по связям RecipeTag."""
+        self.tags_mask = get_tags_mask(
+            RecipeTag.objects.filter(recipe=self).values_list(
+                'tag_id', flat=True,
+            )
+        )
+        Recipe.objects.filter(pk=self.pk).update(tags_mask=self.tags_mask)
+
 
 class RecipeIngredient(models.Model):
     """Модель, связывающая id рецепта с id ингредиента и его количеством."""
@@ -131,6 +243,19 @@ class RecipeIngredient(models.Model):
         return 'Ингридиент в рецепте'
 
 
+def prefetch_full_info(recipes):
+    """Теги и ингредиенты загруженных рецептов за фиксированное
+    число запросов, независимо от их количества."""
+    models.prefetch_related_objects(
+        recipes,
+        'tags',
+        models.Prefetch(
+            'recipeingredient_set',
+            queryset=RecipeIngredient.objects.select_related('ingredient'),
+        ),
+    )
+
+
 class RecipeTag(models.Model):
     """Модель, связывающая id рецепта с id тега."""
 
@@ -213,3 +338,74 @@ class ShoppingList(models.Model):
 
     def __str__(self):
         return f'{self.user} добавил "{self.recipe}" в Список покупок'
+
+
+class ShoppingCartItem(models.Model):
+    """Сумма ингредиента по всем рецептам в корзине пользователя.
+
+    Поддерживается функциями recipes/shopping_cart.py при каждом
+    изменении корзины и ингредиентов рецептов в ней."""
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='cart_items',
+        verbose_name='Пользователь',
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Ингредиент',
+    )
+    amount = models.PositiveIntegerField('Количество')
+
+    class Meta:
+        constraints = [models.UniqueConstraint(
+            fields=['user', 'ingredient'],
+            name='unique_ingredient_in_user_cart',
+        )]
+        verbose_name = 'Ингредиент в списке покупок'
+        verbose_name_plural = 'Ингредиенты в списках покупок'
+
+    def __str__(self):
+        return f'{self.ingredient}: {self.amount}'
+
+
+class FeedItem(models.Model):
+    """Модель ленты подписок: рецепт автора, на которого подписан
+    пользователь. Заполняется при публикации рецепта и при подписке."""
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='feed',
+        verbose_name='Подписчик',
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='feed_items',
+        verbose_name='Рецепт',
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Автор рецепта',
+    )
+
+    class Meta:
+        constraints = [models.UniqueConstraint(
+            fields=['user', 'recipe'],
+            name='unique_recipe_in_user_feed',
+        )]
+        indexes = [models.Index(
+            fields=['user', 'author'],
+            name='feed_user_author_idx',
+        )]
+        verbose_name = 'Лента подписок'
+        verbose_name_plural = 'Ленты подписок'
+
+    def __str__(self):
+        return f'"{self.recipe}" в ленте {self.user}'
@@ -0,0 +1,108 @@
+from django.db import connections
+from django.db.models import BooleanField, FloatField, Q
+from django.db.models.expressions import RawSQL
+
+SEARCH_CONFIG = 'russian'
+FTS_TABLE = 'recipes_recipe_fts'
+
+
+def uses_fts5(using):
+    """Локальная SQLite хранит поисковый индекс в таблице FTS5."""
+    return connections[using].vendor == 'sqlite'
+
+
+# Токенизатор FTS5 не считает ё и е одной буквой.
+FTS5_COLUMNS = (
+    "replace(replace(name, 'ё', 'е'), 'Ё', 'Е'), "
+    "replace(replace(text, 'ё', 'е'), 'Ё', 'Е')"
+)
+
+
+def fold_yo(value):
+    return value.replace('ё', 'е').replace('Ё', 'Е')
+
+
+def get_fts5_query(query):
+    """Слова запроса как префиксы, каждое в кавычках FTS5."""
+    words = fold_yo(query).split()
+    return ' '.join('"{}"*'.format(word.replace('"', '""')) for word in words)
+
+
+def index_recipe(recipe, using):
+    if not uses_fts5(using):
+        return
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {FTS_TABLE} WHERE rowid = %s',
+            [recipe.pk],
+        )
+        cursor.execute(
+            f'INSERT INTO {FTS_TABLE} (rowid, name, text) '
+            'VALUES (%s, %s, %s)',
+            [recipe.pk, fold_yo(recipe.name), fold_yo(recipe.text)],
+        )
+
+
+def unindex_recipe(recipe_id, using):
+    if not uses_fts5(using):
+        return
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {FTS_TABLE} WHERE rowid = %s',
+            [recipe_id],
+        )
+
+
+def rebuild_index(using='default'):
+    """Полная перестройка индекса FTS5 после массовой загрузки."""
+    if not uses_fts5(using):
+        return
+    with connections[using].cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE}')
+        cursor.execute(
+            f'INSERT INTO {FTS_TABLE} (rowid, name, text) '
+            f'SELECT id, {FTS5_COLUMNS} FROM recipes_recipe'
+        )
+
+
+def search_recipes(queryset, query):
+    """Рецепты, в названии или описании которых есть слова запроса,
+    от более релевантных к менее релевантным.
+
+    В PostgreSQL используется столбец search_vector с GIN-индексом,
+    в SQLite - таблица FTS5.
+    """
+    query = query.strip()
+    if not query:
+        return queryset
+    vendor = connections[queryset.db].vendor
+    if vendor == 'postgresql':
+        rank = (
+            'ts_rank("recipes_recipe"."search_vector", '
+            f"plainto_tsquery('{SEARCH_CONFIG}', %s))"
+        )
+        condition = (
+            '"recipes_recipe"."search_vector" @@ '
+            f"plainto_tsquery('{SEARCH_CONFIG}', %s)"
+        )
+        params = [query]
+    elif vendor == 'sqlite':
+        rank = (
+            f'SELECT -bm25({FTS_TABLE}, 10.0, 1.0) FROM {FTS_TABLE} '
+            f'WHERE {FTS_TABLE} MATCH %s '
+            f'AND {FTS_TABLE}.rowid = "recipes_recipe"."id"'
+        )
+        condition = (
+            f'"recipes_recipe"."id" IN (SELECT rowid FROM {FTS_TABLE} '
+            f'WHERE {FTS_TABLE} MATCH %s)'
+        )
+        params = [get_fts5_query(query)]
+    else:
+        return queryset.filter(
+            Q(name__icontains=query) | Q(text__icontains=query)
+        )
+    return queryset.filter(
+        RawSQL(condition, params, output_field=BooleanField()),
+    ).annotate(
+        search_rank=RawSQL(rank, params, output_field=FloatField()),
+    ).order_by('-search_rank', '-id')
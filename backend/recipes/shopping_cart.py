@@ -0,0 +1,72 @@
+from django.db import connections, router
+from django.db.models import F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce, Greatest
+
+from recipes.models import RecipeIngredient, ShoppingCartItem, ShoppingList
+
+ADD_SQL = '''
+    INSERT INTO {item} (user_id, ingredient_id, amount)
+    SELECT cart.user_id, recipe_ingredient.ingredient_id,
+        SUM(recipe_ingredient.amount)
+    FROM ({carts}) cart
+    JOIN {recipe_ingredient} recipe_ingredient
+        ON recipe_ingredient.recipe_id = cart.recipe_id
+    WHERE true
+    GROUP BY cart.user_id, recipe_ingredient.ingredient_id
+    ON CONFLICT (user_id, ingredient_id)
+    DO UPDATE SET amount = {item}.amount + excluded.amount
+'''
+
+
+def add_cart_totals(carts):
+    """Прибавление ингредиентов рецептов из строк ShoppingList carts
+    к суммам корзин их пользователей одним INSERT ... ON CONFLICT."""
+
+    using = router.db_for_write(ShoppingCartItem)
+    connection = connections[using]
+    quote = connection.ops.quote_name
+    sql, params = carts.order_by().values(
+        'user_id', 'recipe_id',
+    ).query.get_compiler(using).as_sql()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            ADD_SQL.format(
+                item=quote(ShoppingCartItem._meta.db_table),
+                recipe_ingredient=quote(RecipeIngredient._meta.db_table),
+                carts=sql,
+            ),
+            params,
+        )
+
+
+def subtract_cart_totals(carts):
+    """Вычитание ингредиентов рецептов из строк carts; вызывается
+    до удаления этих строк. Обнулившиеся суммы удаляются."""
+
+    delta = RecipeIngredient.objects.filter(
+        recipe_id__in=carts.filter(
+            user_id=OuterRef(OuterRef('user_id')),
+        ).order_by().values('recipe_id'),
+        ingredient_id=OuterRef('ingredient_id'),
+    ).order_by().values('ingredient_id').annotate(
+        total=Sum('amount'),
+    ).values('total')
+    items = ShoppingCartItem.objects.filter(
+        user_id__in=carts.order_by().values('user_id'),
+    )
+    items.update(amount=Greatest(
+        F('amount') - Coalesce(Subquery(delta), 0), 0,
+    ))
+    items.filter(amount=0).delete()
+
+
+def rebuild_cart_totals(users=None):
+    """Пересчёт сумм корзин с нуля, для всех или только для users."""
+
+    items = ShoppingCartItem.objects.all()
+    carts = ShoppingList.objects.all()
+    if users is not None:
+        items = items.filter(user__in=users)
+        carts = carts.filter(user__in=users)
+    items.delete()
+    add_cart_totals(carts)
@@ -0,0 +1,129 @@
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_delete,
+)
+from django.dispatch import receiver
+
+from recipes.cache import (
+    INGREDIENTS_SCOPE,
+    TAGS_SCOPE,
+    bump_version,
+    invalidate_author_payloads,
+    invalidate_recipe_payloads,
+)
+from recipes.feed import fan_out_recipe
+from recipes.images import schedule_variants
+from recipes.search import index_recipe, unindex_recipe
+from recipes.shopping_cart import subtract_cart_totals
+from recipes.models import (
+    Favorite,
+    Ingredient,
+    Recipe,
+    RecipeIngredient,
+    ShoppingList,
+    Tag,
+    User,
+    get_tags_mask,
+)
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+def ingredients_changed(**kwargs):
+    """Изменение справочника ингредиентов."""
+    bump_version(INGREDIENTS_SCOPE)
+
+
+@receiver((post_save, post_delete), sender=Tag)
+def tags_changed(**kwargs):
+    """Изменение справочника тегов."""
+    bump_version(TAGS_SCOPE)
+
+
+@receiver(post_delete, sender=Tag)
+def tag_deleted(instance, **kwargs):
+    """Связи RecipeTag удаляются каскадом без сигналов, поэтому бит
+    удалённого тега снимается с масок рецептов одним запросом."""
+    mask = get_tags_mask([instance.pk])
+    if mask:
+        Recipe.objects.with_any_tag([instance.pk]).update(
+            tags_mask=F('tags_mask') - mask,
+        )
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def recipe_tags_set(instance, action, pk_set, **kwargs):
+    """recipe.tags.set(), add() и remove(): маска пересчитывается
+    один раз на рецепт, а не на каждую строку RecipeTag."""
+    if not action.startswith('post_'):
+        return
+    if isinstance(instance, Recipe):
+        recipes = [instance]
+    else:
+        recipes = Recipe.objects.filter(pk__in=pk_set or ()).only('pk')
+    for recipe in recipes:
+        recipe.update_tags_mask()
+    invalidate_recipe_payloads([recipe.pk for recipe in recipes])
+
+
+@receiver(post_save, sender=RecipeIngredient)
+def recipe_ingredients_changed(instance, **kwargs):
+    """Удаление строк рецепта сопровождается сохранением рецепта,
+    которое сбрасывает кэш само."""
+    invalidate_recipe_payloads([instance.recipe_id])
+
+
+@receiver(post_save, sender=User)
+def author_changed(instance, created, **kwargs):
+    if not created:
+        invalidate_author_payloads([instance.pk])
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_saved(instance, created, using, **kwargs):
+    """Построение уменьшенных копий изображения, поисковый индекс
+    и рассылка нового рецепта по лентам подписчиков."""
+    schedule_variants(instance)
+    index_recipe(instance, using)
+    invalidate_recipe_payloads([instance.pk])
+    if created:
+        User.objects.filter(pk=instance.author_id).update(
+            recipes_count=F('recipes_count') + 1,
+        )
+        transaction.on_commit(lambda: fan_out_recipe(instance))
+
+
+@receiver(pre_delete, sender=Recipe)
+def recipe_deleting(instance, **kwargs):
+    """Каскадное удаление строк корзины не вызывает сигналов,
+    поэтому суммы корзин правятся до удаления рецепта."""
+    subtract_cart_totals(ShoppingList.objects.filter(recipe=instance))
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_deleted(instance, using, **kwargs):
+    unindex_recipe(instance.pk, using)
+    invalidate_recipe_payloads([instance.pk])
+    User.objects.filter(
+        pk=instance.author_id,
+        recipes_count__gt=0,
+    ).update(recipes_count=F('recipes_count') - 1)
+
+
+@receiver(post_save, sender=Favorite)
+def favorite_added(instance, created, **kwargs):
+    if created:
+        Recipe.objects.filter(pk=instance.recipe_id).update(
+            favorites_count=F('favorites_count') + 1,
+        )
+
+
+@receiver(pre_delete, sender=User)
+def user_deleting(instance, **kwargs):
+    """Избранное пользователя удаляется каскадом без сигналов:
+    у обработчика удаления Favorite Django выбирал бы и обновлял
+    рецепты по одной строке, в том числе при удалении рецепта."""
+    Recipe.objects.subtract_favorites(Favorite.objects.filter(user=instance))
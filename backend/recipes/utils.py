@@ -1,36 +1,45 @@
-from django.http.response import HttpResponse
-
-
-def get_ingredients_list(ingredients_list):
-    """Формирование списка покупок."""
-
-    ingredients_dict = {}
-    list_to_buy = []
-    if not ingredients_list:
-        return (['Добавьте в корзину хотя бы один рецепт!', ])
-    for ingredient in ingredients_list:
-        amount = ingredient.amount
-        name = ingredient.ingredient.name
-        measurement_unit = ingredient.ingredient.measurement_unit
-        if name in ingredients_dict:
-            ingredients_dict[name]['amount'] += amount
-        else:
-            ingredients_dict[name] = {
-                'measurement_unit': measurement_unit,
-                'amount': amount,
-            }
-    for ingredient, params in ingredients_dict.items():
-        pam = params["amount"]
-        pmu = params["measurement_unit"]
-        list_to_buy.append(
-            f'{ingredient}-{pam} {pmu}.\n',
+from django.conf import settings
+from django.http.response import StreamingHttpResponse
+
+
+def get_recipes_limit(request):
+    """Количество рецептов автора из параметра recipes_limit."""
+
+    default = int(settings.RECIPES_LIMIT)
+    if request is None:
+        return default
+    try:
+        limit = int(request.query_params.get('recipes_limit', default))
+    except (TypeError, ValueError):
+        return default
+    return limit if limit >= 0 else default
+
+
+def get_ingredients_list(ingredients):
+    """Построчное формирование списка покупок.
+
+    Принимает уже загруженные строки со значениями name,
+    measurement_unit и total_amount: в режиме ASGI ответ отдаётся из
+    цикла событий, где обращаться к базе нельзя.
+    """
+
+    is_empty = True
+    for ingredient in ingredients:
+        is_empty = False
+        yield (
+            f'{ingredient["name"]}-{ingredient["total_amount"]} '
+            f'{ingredient["measurement_unit"]}.\n'
         )
-    return list_to_buy
+    if is_empty:
+        yield 'Добавьте в корзину хотя бы один рецепт!'
 
 
 def download_response(download_list, filename):
-    """Формирование файла для скачивания списка покупок."""
+    """Потоковая отдача файла со списком покупок."""
 
-    response = HttpResponse(download_list, 'Content-Type: text/plain')
+    response = StreamingHttpResponse(
+        download_list,
+        content_type='text/plain; charset=utf-8',
+    )
     response['Content-Disposition'] = f'attachment; filename="{filename}"'
     return response
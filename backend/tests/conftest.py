@@ -0,0 +1,161 @@
+import io
+
+import pytest
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from PIL import Image
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from foodgram.db_router import REPLICA_DB_ALIAS
+from recipes.models import (
+    Favorite,
+    Ingredient,
+    Recipe,
+    RecipeIngredient,
+    RecipeTag,
+    ShoppingList,
+    Tag,
+)
+from users.models import Follow
+
+IMAGE_NAME = 'recipes/test.jpg'
+
+
+@pytest.fixture(scope='session')
+def django_db_modify_db_settings(
+    django_db_modify_db_settings_parallel_suffix,
+):
+    """Реплика - зеркало основной тестовой базы. Чтение с неё
+    включается только вместе с ReplicaRouter (tests/test_replica.py)."""
+    settings.DATABASES.setdefault(REPLICA_DB_ALIAS, {
+        **settings.DATABASES[DEFAULT_DB_ALIAS],
+        'TEST': {'MIRROR': DEFAULT_DB_ALIAS},
+    })
+
+
+@pytest.fixture(autouse=True)
+def media(settings, tmp_path):
+    """Изображения рецептов во временном MEDIA_ROOT."""
+    settings.MEDIA_ROOT = tmp_path
+    (tmp_path / 'recipes').mkdir()
+    content = io.BytesIO()
+    Image.new('RGB', (64, 64), 'orange').save(content, 'JPEG')
+    (tmp_path / IMAGE_NAME).write_bytes(content.getvalue())
+    return tmp_path
+
+
+@pytest.fixture(autouse=True)
+def metrics_dir(settings, tmp_path):
+    settings.METRICS_DIR = str(tmp_path / 'metrics')
+    return tmp_path / 'metrics'
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+def create_user(django_user_model, name):
+    return django_user_model.objects.create_user(
+        email=f'{name}@example.com',
+        username=name,
+        first_name=name,
+        last_name=name,
+        password='password',
+    )
+
+
+@pytest.fixture
+def user(django_user_model):
+    return create_user(django_user_model, 'user')
+
+
+@pytest.fixture
+def admin_user(django_user_model):
+    """Суперпользователь для admin_client: вход по email."""
+    return django_user_model.objects.create_superuser(
+        email='admin@example.com',
+        username='admin',
+        first_name='admin',
+        last_name='admin',
+        password='password',
+    )
+
+
+@pytest.fixture
+def authors(django_user_model):
+    return [
+        create_user(django_user_model, f'author{number}')
+        for number in range(3)
+    ]
+
+
+@pytest.fixture
+def user_client(user):
+    client = APIClient()
+    token = Token.objects.create(user=user)
+    client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+    return client
+
+
+@pytest.fixture
+def tags():
+    return [
+        Tag.objects.create(name=slug, color=f'#00000{number}', slug=slug)
+        for number, slug in enumerate(('breakfast', 'lunch', 'dinner'))
+    ]
+
+
+@pytest.fixture
+def ingredients():
+    return [
+        Ingredient.objects.create(name=name, measurement_unit='г')
+        for name in ('мука', 'сахар', 'соль', 'масло')
+    ]
+
+
+def create_recipe(author, tags, ingredients, name='Рецепт'):
+    recipe = Recipe.objects.create(
+        author=author,
+        name=name,
+        image=IMAGE_NAME,
+        text='Описание',
+        cooking_time=10,
+    )
+    RecipeTag.objects.bulk_create(
+        RecipeTag(recipe=recipe, tag=tag) for tag in tags
+    )
+    RecipeIngredient.objects.bulk_create(
+        RecipeIngredient(recipe=recipe, ingredient=ingredient, amount=100)
+        for ingredient in ingredients
+    )
+    recipe.update_tags_mask()
+    return recipe
+
+
+@pytest.fixture
+def recipes(authors, tags, ingredients):
+    """60 рецептов трёх авторов с двумя тегами и тремя ингредиентами."""
+    return [
+        create_recipe(
+            authors[number % len(authors)],
+            tags[number % 2:number % 2 + 2],
+            ingredients[number % 2:number % 2 + 3],
+            name=f'Рецепт {number}',
+        )
+        for number in range(60)
+    ]
+
+
+@pytest.fixture
+def user_relations(user, authors, recipes):
+    """Избранное, корзина и подписка пользователя."""
+    for recipe in recipes[::3]:
+        Favorite.objects.create(user=user, recipe=recipe)
+    for recipe in recipes[::4]:
+        ShoppingList.objects.create(user=user, recipe=recipe)
+    Follow.objects.create(user=user, author=authors[0])
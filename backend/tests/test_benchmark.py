@@ -0,0 +1,21 @@
+import pytest
+
+from api import benchmark
+
+# Без транзакции теста: точки сохранения добавили бы запросы.
+pytestmark = [
+    pytest.mark.benchmark,
+    pytest.mark.django_db(transaction=True),
+]
+
+
+def test_api_against_baseline(settings):
+    """Запуск: pytest -m benchmark."""
+    settings.CACHE_SHARED = True
+    benchmark.generate_data()
+    results = benchmark.measure(repeat=30)
+    lines, regressions = benchmark.compare(
+        results, benchmark.load_baseline(),
+    )
+    print('\n'.join(lines))
+    assert not regressions, '\n'.join(regressions)
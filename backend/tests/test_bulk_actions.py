@@ -0,0 +1,43 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from recipes.models import Favorite, Recipe
+
+BULK_URL = '/api/recipes/favorite/'
+
+
+def get_counts(recipes):
+    return list(Recipe.objects.filter(
+        pk__in=[recipe.pk for recipe in recipes],
+    ).order_by('pk').values_list('favorites_count', flat=True))
+
+
+@pytest.mark.django_db
+def test_bulk_favorite_add_and_delete(user_client, user, recipes):
+    ids = [recipe.id for recipe in recipes[:5]]
+    response = user_client.post(BULK_URL, {'recipes': ids}, format='json')
+    assert {row['status'] for row in response.data['results']} == {'added'}
+    response = user_client.post(BULK_URL, {'recipes': ids}, format='json')
+    assert {row['status'] for row in response.data['results']} == {
+        'already_added',
+    }
+    assert get_counts(recipes[:5]) == [1] * 5
+    with CaptureQueriesContext(connection) as context:
+        response = user_client.delete(
+            BULK_URL, {'recipes': ids}, format='json',
+        )
+    assert {row['status'] for row in response.data['results']} == {'removed'}
+    assert get_counts(recipes[:5]) == [0] * 5
+    assert not Favorite.objects.filter(user=user).exists()
+    table = Favorite._meta.db_table
+    deletes = [
+        query for query in context.captured_queries
+        if query['sql'].startswith(f'DELETE FROM "{table}"')
+    ]
+    assert len(deletes) == 1
+    if connection.features.has_select_for_update:
+        assert any(
+            'FOR UPDATE' in query['sql']
+            for query in context.captured_queries
+        )
@@ -0,0 +1,32 @@
+import asyncio
+
+import pytest
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from api.async_views import pooled
+from api.views_recipes import RecipeViewSet
+
+DOWNLOAD_URL = '/api/recipes/download_shopping_cart/'
+
+
+@pytest.mark.django_db(transaction=True)
+def test_download_streams_in_event_loop(user, user_client, recipes):
+    for recipe in recipes[:2]:
+        response = user_client.post(f'/api/recipes/{recipe.id}/shopping_cart/')
+        assert response.status_code == 201
+    view = pooled(RecipeViewSet.as_view({'get': 'download_shopping_cart'}))
+    request = APIRequestFactory().get(DOWNLOAD_URL)
+    force_authenticate(request, user=user)
+
+    async def download():
+        # Ответ читается в цикле событий, как в ASGIHandler: запрос
+        # к базе здесь вызвал бы SynchronousOnlyOperation.
+        response = await view(request)
+        return b''.join(response.streaming_content).decode()
+
+    assert asyncio.run(download()).splitlines() == [
+        'масло-100 г.',
+        'мука-100 г.',
+        'сахар-200 г.',
+        'соль-200 г.',
+    ]
@@ -0,0 +1,54 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from recipes.models import Favorite, Recipe
+from tests.conftest import create_recipe, create_user
+
+
+def get_count(recipe):
+    return Recipe.objects.values_list('favorites_count', flat=True).get(
+        pk=recipe.pk,
+    )
+
+
+def count_delete_queries(recipe):
+    with CaptureQueriesContext(connection) as context:
+        recipe.delete()
+    return len(context)
+
+
+@pytest.mark.django_db
+def test_recipe_delete_does_not_depend_on_favorites(
+    django_user_model, authors, tags, ingredients,
+):
+    lonely = create_recipe(authors[0], tags, ingredients)
+    popular = create_recipe(authors[0], tags, ingredients)
+    for index in range(20):
+        user = create_user(django_user_model, f'fan{index}')
+        Favorite.objects.create(user=user, recipe=popular)
+    assert get_count(popular) == 20
+    assert count_delete_queries(popular) == count_delete_queries(lonely)
+
+
+@pytest.mark.django_db
+def test_favorite_delete_decrements(user_client, recipes):
+    recipe = recipes[0]
+    url = f'/api/recipes/{recipe.id}/favorite/'
+    assert user_client.post(url).status_code == 201
+    assert get_count(recipe) == 1
+    assert user_client.delete(url).status_code == 204
+    assert get_count(recipe) == 0
+
+
+@pytest.mark.django_db
+def test_user_delete_decrements(django_user_model, recipes):
+    fan = create_user(django_user_model, 'fan')
+    Favorite.objects.bulk_create([
+        Favorite(user=fan, recipe=recipe) for recipe in recipes[:3]
+    ])
+    Recipe.objects.filter(pk__in=[r.pk for r in recipes[:3]]).update(
+        favorites_count=1,
+    )
+    fan.delete()
+    assert {get_count(recipe) for recipe in recipes[:3]} == {0}
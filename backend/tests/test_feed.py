@@ -0,0 +1,88 @@
+import pytest
+
+from recipes.models import FeedItem
+from tests.conftest import create_recipe
+from users.models import Follow
+
+FEED_URL = '/api/recipes/feed/'
+
+
+def feed_ids(client, **params):
+    """id рецептов всех страниц ленты по курсору next."""
+    ids = []
+    response = client.get(FEED_URL, params)
+    while True:
+        assert response.status_code == 200
+        ids += [recipe['id'] for recipe in response.data['results']]
+        if not response.data['next']:
+            return ids
+        response = client.get(response.data['next'])
+
+
+def author_recipe_ids(recipes, author):
+    return sorted(
+        (recipe.id for recipe in recipes if recipe.author == author),
+        reverse=True,
+    )
+
+
+@pytest.mark.django_db
+def test_new_recipe_fans_out(
+    user, user_client, authors, tags, ingredients,
+    django_capture_on_commit_callbacks,
+):
+    Follow.objects.create(user=user, author=authors[0])
+    with django_capture_on_commit_callbacks(execute=True):
+        recipe = create_recipe(authors[0], tags, ingredients)
+        create_recipe(authors[1], tags, ingredients)
+    assert feed_ids(user_client) == [recipe.id]
+
+
+@pytest.mark.django_db
+def test_subscribe_backfills_and_unsubscribe_trims(
+    user_client, authors, recipes,
+):
+    url = f'/api/users/{authors[0].id}/subscribe/'
+    assert user_client.post(url).status_code == 201
+    assert feed_ids(user_client, limit=3) == author_recipe_ids(
+        recipes, authors[0],
+    )
+    assert user_client.delete(url).status_code == 204
+    assert feed_ids(user_client) == []
+
+
+@pytest.mark.django_db
+def test_feed_cursor_pages(user, user_client, authors, recipes):
+    for author in authors[:2]:
+        user_client.post(f'/api/users/{author.id}/subscribe/')
+    response = user_client.get(FEED_URL, {'limit': 7})
+    assert len(response.data['results']) == 7
+    ids = feed_ids(user_client, limit=7)
+    assert ids == sorted(
+        author_recipe_ids(recipes, authors[0])
+        + author_recipe_ids(recipes, authors[1]),
+        reverse=True,
+    )
+
+
+@pytest.mark.django_db
+def test_admin_follow_changes_feed(admin_client, user, authors, recipes):
+    response = admin_client.post('/admin/users/follow/add/', {
+        'user': user.id, 'author': authors[0].id,
+    })
+    assert response.status_code == 302
+    follow = Follow.objects.get(user=user)
+    assert FeedItem.objects.filter(user=user).count() == 20
+    admin_client.post(f'/admin/users/follow/{follow.id}/change/', {
+        'user': user.id, 'author': authors[1].id,
+    })
+    assert set(FeedItem.objects.filter(user=user).values_list(
+        'author_id', flat=True,
+    )) == {authors[1].id}
+    admin_client.post('/admin/users/follow/', {
+        'action': 'delete_selected',
+        '_selected_action': [follow.id],
+        'post': 'yes',
+    })
+    assert not Follow.objects.exists()
+    assert not FeedItem.objects.filter(user=user).exists()
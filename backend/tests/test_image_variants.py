@@ -0,0 +1,42 @@
+import pytest
+from django.core.files.storage import default_storage
+
+from recipes.images import generate_variants, get_expected_variants
+from recipes.models import Recipe
+from tests.conftest import IMAGE_NAME, create_recipe
+
+
+@pytest.fixture
+def recipe(user, tags, ingredients):
+    return create_recipe(user, tags, ingredients)
+
+
+@pytest.mark.django_db
+def test_variants_recorded(recipe):
+    generate_variants(IMAGE_NAME)
+    variants = Recipe.objects.get(pk=recipe.pk).image_variants
+    assert variants == get_expected_variants(IMAGE_NAME)
+    assert all(default_storage.exists(name) for name in variants.values())
+
+
+@pytest.mark.django_db
+def test_render_does_not_touch_storage(client, recipe, monkeypatch):
+    url = f'/api/recipes/{recipe.id}/'
+    assert set(client.get(url).data['image_variants'].values()) == {None}
+    generate_variants(IMAGE_NAME)
+
+    def exists(name):
+        raise AssertionError(f'default_storage.exists({name})')
+
+    monkeypatch.setattr(default_storage, 'exists', exists)
+    variants = client.get(url).data['image_variants']
+    assert variants['thumbnail'].endswith('test_thumbnail.jpg')
+    assert client.get('/api/recipes/').status_code == 200
+
+
+@pytest.mark.django_db
+def test_changed_image_has_no_variants(client, recipe):
+    generate_variants(IMAGE_NAME)
+    Recipe.objects.filter(pk=recipe.pk).update(image='recipes/other.jpg')
+    response = client.get(f'/api/recipes/{recipe.id}/')
+    assert set(response.data['image_variants'].values()) == {None}
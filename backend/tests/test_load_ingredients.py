@@ -0,0 +1,40 @@
+import io
+import json
+
+import pytest
+from django.core.management import call_command
+
+from recipes.management.commands.load_ingredients import (
+    DEFAULT_PATH,
+    iter_json_array,
+)
+from recipes.models import Ingredient
+
+JSON_PATH = DEFAULT_PATH.with_suffix('.json')
+
+
+@pytest.mark.parametrize('chunk_size', (1, 7, 4096))
+def test_json_array_read_in_chunks(chunk_size):
+    with open(JSON_PATH, encoding='utf-8') as file:
+        rows = list(iter_json_array(file, chunk_size))
+    assert rows == json.loads(JSON_PATH.read_text(encoding='utf-8'))
+    assert list(iter_json_array(io.StringIO(' [1, 23 ,456]'), 2)) == [
+        1, 23, 456,
+    ]
+    assert list(iter_json_array(io.StringIO('[ ]'), 1)) == []
+
+
+@pytest.mark.parametrize(
+    'content', ('[1, 2', '{"name": "соль"}', '[1 2]', '[1,]', '[{"a": 1'),
+)
+def test_json_array_errors(content):
+    with pytest.raises(ValueError):
+        list(iter_json_array(io.StringIO(content), 2))
+
+
+@pytest.mark.django_db
+def test_load_json_matches_csv():
+    call_command('load_ingredients', str(JSON_PATH), stdout=io.StringIO())
+    loaded = set(Ingredient.objects.values_list('name', 'measurement_unit'))
+    call_command('load_ingredients', stdout=io.StringIO())
+    assert Ingredient.objects.count() == len(loaded)
@@ -0,0 +1,49 @@
+import json
+import subprocess
+import sys
+
+from foodgram.metrics import RETIRED_FILE, Metrics, clear_snapshots
+
+
+def dead_pid():
+    process = subprocess.Popen([sys.executable, '-c', ''])
+    process.wait()
+    return process.pid
+
+
+def record(metrics, count):
+    for _ in range(count):
+        metrics.record('recipes-list', 'GET', 200, 0.01, 3, 0.001)
+    metrics.flush()
+
+
+def requests_total(metrics):
+    return metrics.collect()['requests']['recipes-list GET 200']
+
+
+def test_dead_worker_snapshot_is_retired(metrics_dir):
+    worker = Metrics()
+    worker.name = f'{dead_pid()}-1'
+    record(worker, 2)
+    current = Metrics()
+    record(current, 3)
+    assert requests_total(current) == 5
+    assert not (metrics_dir / f'{worker.name}.json').exists()
+    retired = json.loads((metrics_dir / RETIRED_FILE).read_text())
+    assert retired['requests'] == {'recipes-list GET 200': 2}
+    assert requests_total(current) == 5
+
+
+def test_reused_pid_does_not_overwrite(metrics_dir):
+    pid = dead_pid()
+    for started, count in ((1, 2), (2, 4)):
+        worker = Metrics()
+        worker.name = f'{pid}-{started}'
+        record(worker, count)
+    assert requests_total(Metrics()) == 6
+
+
+def test_clear_snapshots(metrics_dir):
+    record(Metrics(), 1)
+    clear_snapshots()
+    assert not metrics_dir.exists()
@@ -0,0 +1,101 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from recipes.models import RecipeIngredient, ShoppingCartItem
+from tests.conftest import create_recipe, create_user
+
+WRITES = ('INSERT INTO "{}"', 'UPDATE "{}"', 'DELETE FROM "{}"')
+
+
+@pytest.fixture
+def recipe(user, tags, ingredients):
+    return create_recipe(user, tags[:2], ingredients[:3])
+
+
+def patch_writes(client, recipe, data, table):
+    """Запросы PATCH, изменяющие таблицу table."""
+    writes = tuple(write.format(table) for write in WRITES)
+    with CaptureQueriesContext(connection) as context:
+        response = client.patch(
+            f'/api/recipes/{recipe.id}/', data, format='json',
+        )
+    assert response.status_code == 200, response.data
+    return [
+        query['sql'] for query in context.captured_queries
+        if query['sql'].startswith(writes)
+    ]
+
+
+def ingredients_data(recipe, **amounts):
+    return [
+        {'id': row.ingredient_id, 'amount': amounts.get(
+            row.ingredient.name, row.amount,
+        )}
+        for row in recipe.recipeingredient_set.select_related('ingredient')
+    ]
+
+
+def cart_totals(user):
+    return dict(ShoppingCartItem.objects.filter(user=user).values_list(
+        'ingredient__name', 'amount',
+    ))
+
+
+@pytest.mark.django_db
+def test_text_patch_keeps_rows(user_client, recipe, tags):
+    data = {
+        'text': 'Новое описание',
+        'tags': [tags[0].id, tags[1].id],
+        'ingredients': ingredients_data(recipe),
+    }
+    for table in ('recipes_recipeingredient', 'recipes_recipetag'):
+        assert patch_writes(user_client, recipe, data, table) == []
+
+
+@pytest.mark.django_db
+def test_amount_patch_updates_one_row(user_client, recipe):
+    rows = dict(recipe.recipeingredient_set.values_list('ingredient_id', 'id'))
+    writes = patch_writes(
+        user_client,
+        recipe,
+        {'ingredients': ingredients_data(recipe, мука=250)},
+        'recipes_recipeingredient',
+    )
+    assert len(writes) == 1 and writes[0].startswith('UPDATE')
+    assert dict(recipe.recipeingredient_set.values_list(
+        'ingredient_id', 'id',
+    )) == rows
+    assert dict(RecipeIngredient.objects.filter(
+        recipe=recipe,
+    ).values_list('ingredient__name', 'amount')) == {
+        'мука': 250, 'сахар': 100, 'соль': 100,
+    }
+
+
+@pytest.mark.django_db
+def test_patch_adjusts_cart_totals(
+    django_user_model, user, user_client, recipe, tags, ingredients,
+):
+    other = create_recipe(user, tags[:1], ingredients[:1])
+    buyer = create_user(django_user_model, 'buyer')
+    buyer_client = APIClient()
+    buyer_client.credentials(
+        HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=buyer).key}',
+    )
+    for client in (user_client, buyer_client):
+        client.post(f'/api/recipes/{recipe.id}/shopping_cart/')
+    buyer_client.post(f'/api/recipes/{other.id}/shopping_cart/')
+    # Мука меняет количество, соль убирается, масло добавляется.
+    response = user_client.patch(f'/api/recipes/{recipe.id}/', {
+        'ingredients': [
+            {'id': ingredients[0].id, 'amount': 30},
+            {'id': ingredients[1].id, 'amount': 100},
+            {'id': ingredients[3].id, 'amount': 5},
+        ],
+    }, format='json')
+    assert response.status_code == 200, response.data
+    assert cart_totals(user) == {'мука': 30, 'сахар': 100, 'масло': 5}
+    assert cart_totals(buyer) == {'мука': 130, 'сахар': 100, 'масло': 5}
@@ -0,0 +1,78 @@
+import pytest
+from django.core.cache import cache
+
+from tests.conftest import create_recipe
+
+# Токен с пользователем, количество и страница рецептов, теги,
+# ингредиенты, авторы и отметки пользователя: число запросов
+# не зависит от размера страницы.
+RECIPES_LIST_QUERIES = 7
+# С общим кэшем после первого запроса остаются количество и страница.
+RECIPES_LIST_WARM_QUERIES = 2
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('limit', (5, 50))
+def test_recipes_list_queries_cold_cache(
+    user_client, user_relations, django_assert_num_queries, limit,
+):
+    with django_assert_num_queries(RECIPES_LIST_QUERIES):
+        response = user_client.get('/api/recipes/', {'limit': limit})
+    assert response.status_code == 200
+    assert len(response.data['results']) == limit
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('limit', (5, 50))
+def test_recipes_list_flags(user_client, user_relations, recipes, limit):
+    response = user_client.get('/api/recipes/', {'limit': limit})
+    favorited = {recipe.id for recipe in recipes[::3]}
+    in_cart = {recipe.id for recipe in recipes[::4]}
+    for item in response.data['results']:
+        assert item['is_favorited'] == (item['id'] in favorited)
+        assert item['is_in_shopping_cart'] == (item['id'] in in_cart)
+        assert item['author']['is_subscribed'] == (
+            item['author']['username'] == 'author0'
+        )
+        assert len(item['tags']) == 2
+        assert len(item['ingredients']) == 3
+
+
+@pytest.mark.django_db
+def test_recipe_detail_queries_cold_cache(
+    user_client, user_relations, recipes, django_assert_max_num_queries,
+):
+    cache.clear()
+    with django_assert_max_num_queries(RECIPES_LIST_QUERIES):
+        response = user_client.get(f'/api/recipes/{recipes[0].id}/')
+    assert response.status_code == 200
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('limit', (5, 50))
+def test_recipes_list_queries_warm_shared_cache(
+    settings, user_client, user_relations, django_assert_num_queries, limit,
+):
+    settings.CACHE_SHARED = True
+    user_client.get('/api/recipes/', {'limit': limit})
+    with django_assert_num_queries(RECIPES_LIST_WARM_QUERIES):
+        response = user_client.get('/api/recipes/', {'limit': limit})
+    assert len(response.data['results']) == limit
+
+
+@pytest.mark.django_db
+def test_recipe_change_resets_shared_payload(
+    settings, user_client, user, ingredients, tags,
+    django_capture_on_commit_callbacks,
+):
+    settings.CACHE_SHARED = True
+    recipe = create_recipe(user, tags, ingredients)
+    url = f'/api/recipes/{recipe.id}/'
+    assert user_client.get(url).data['name'] == 'Рецепт'
+    with django_capture_on_commit_callbacks(execute=True):
+        response = user_client.patch(url, {'name': 'Суп'}, format='json')
+    assert response.status_code == 200
+    assert user_client.get(url).data['name'] == 'Суп'
+    assert user_client.get('/api/recipes/').data['results'][0]['name'] == (
+        'Суп'
+    )
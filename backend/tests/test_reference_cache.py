@@ -0,0 +1,42 @@
+import time
+
+import pytest
+
+from recipes.cache import TAGS_SCOPE, get_version
+
+
+@pytest.mark.django_db
+def test_tags_not_modified(client, tags):
+    response = client.get('/api/tags/')
+    assert response.status_code == 200
+    etag = response['ETag']
+    response = client.get('/api/tags/', HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 304
+
+
+@pytest.mark.django_db
+def test_tag_change_updates_etag_and_data(client, tags):
+    etag = client.get('/api/tags/')['ETag']
+    tags[0].name = 'Завтрак'
+    tags[0].save()
+    response = client.get('/api/tags/', HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response['ETag'] != etag
+    assert 'Завтрак' in {tag['name'] for tag in response.data}
+
+
+def test_local_version_expires(settings):
+    settings.CACHE_SHARED = False
+    settings.LOCAL_VERSION_TIMEOUT = 1
+    version = get_version(TAGS_SCOPE)
+    assert get_version(TAGS_SCOPE) == version
+    time.sleep(1.1)
+    assert get_version(TAGS_SCOPE) != version
+
+
+def test_shared_version_does_not_expire(settings):
+    settings.CACHE_SHARED = True
+    settings.LOCAL_VERSION_TIMEOUT = 1
+    version = get_version(TAGS_SCOPE)
+    time.sleep(1.1)
+    assert get_version(TAGS_SCOPE) == version
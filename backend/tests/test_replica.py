@@ -0,0 +1,81 @@
+import re
+import time
+from contextlib import ExitStack
+
+import pytest
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test.utils import CaptureQueriesContext
+
+from foodgram.db_router import REPLICA_DB_ALIAS, REPLICA_ROUTER
+
+TABLE = re.compile(r'(?:FROM|JOIN|INTO|UPDATE) "(\w+)"')
+
+# Без транзакции теста: реплика - отдельное соединение и видит только
+# закоммиченные данные.
+pytestmark = pytest.mark.django_db(
+    transaction=True,
+    databases={DEFAULT_DB_ALIAS, REPLICA_DB_ALIAS},
+)
+
+
+@pytest.fixture(autouse=True)
+def replica_router(settings):
+    settings.DATABASE_ROUTERS = [REPLICA_ROUTER]
+
+
+def request_tables(client, method, path):
+    """Таблицы, к которым обращался запрос, по базам."""
+    with ExitStack() as stack:
+        contexts = {
+            alias: stack.enter_context(
+                CaptureQueriesContext(connections[alias]),
+            )
+            for alias in (DEFAULT_DB_ALIAS, REPLICA_DB_ALIAS)
+        }
+        response = getattr(client, method)(path)
+    assert response.status_code < 400, response.data
+    return {
+        alias: {
+            table
+            for query in context.captured_queries
+            for table in TABLE.findall(query['sql'])
+        }
+        for alias, context in contexts.items()
+    }
+
+
+def test_safe_requests_read_replica(client, user_client, recipes):
+    recipe = recipes[0]
+    tag = recipe.tags.first()
+    ingredient = recipe.ingredients.first()
+    for http, path in (
+        (user_client, '/api/recipes/?limit=5'),
+        (user_client, f'/api/recipes/{recipe.id}/'),
+        (client, f'/api/tags/{tag.id}/'),
+        (client, f'/api/ingredients/{ingredient.id}/'),
+    ):
+        tables = request_tables(http, 'get', path)
+        assert any(
+            table.startswith('recipes_') for table in tables[REPLICA_DB_ALIAS]
+        ), path
+        assert tables[DEFAULT_DB_ALIAS] <= {
+            'authtoken_token', 'users_user',
+        }, path
+
+
+def test_writer_pinned_to_primary(settings, client, user_client, recipes):
+    settings.REPLICA_PIN_TIMEOUT = 1
+    path = f'/api/recipes/{recipes[0].id}/'
+    tables = request_tables(user_client, 'post', path + 'favorite/')
+    assert 'recipes_favorite' in tables[DEFAULT_DB_ALIAS]
+    assert not tables[REPLICA_DB_ALIAS]
+    tables = request_tables(user_client, 'get', path)
+    assert 'recipes_favorite' in tables[DEFAULT_DB_ALIAS]
+    assert not tables[REPLICA_DB_ALIAS]
+    # Закреплён только писавший пользователь.
+    tables = request_tables(client, 'get', path)
+    assert 'recipes_recipe' in tables[REPLICA_DB_ALIAS]
+    time.sleep(settings.REPLICA_PIN_TIMEOUT + 0.1)
+    tables = request_tables(user_client, 'get', path)
+    assert 'recipes_favorite' in tables[REPLICA_DB_ALIAS]
+    assert 'recipes_recipe' not in tables[DEFAULT_DB_ALIAS]
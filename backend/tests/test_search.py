@@ -0,0 +1,33 @@
+import pytest
+from django.db import connection
+
+from recipes.models import Recipe
+from recipes.search import search_recipes
+from tests.conftest import create_recipe
+
+
+@pytest.mark.django_db
+def test_search_ranks_name_above_text(client, authors, tags, ingredients):
+    soup = create_recipe(authors[0], tags, ingredients, name='Суп')
+    soup.text = 'Подавать со сметаной'
+    soup.save()
+    borscht = create_recipe(
+        authors[1], tags, ingredients, name='Борщ со сметаной',
+    )
+    create_recipe(authors[2], tags, ingredients, name='Каша')
+    response = client.get('/api/recipes/', {'search': 'сметаной'})
+    assert response.status_code == 200
+    assert [recipe['id'] for recipe in response.data['results']] == [
+        borscht.id, soup.id,
+    ]
+
+
+@pytest.mark.django_db
+def test_search_uses_gin_index(recipes):
+    if connection.vendor != 'postgresql':
+        pytest.skip('GIN-индекс поиска есть только в PostgreSQL.')
+    queryset = search_recipes(Recipe.objects.all(), 'рецепт')
+    with connection.cursor() as cursor:
+        cursor.execute('SET LOCAL enable_seqscan = off')
+    assert 'recipes_recipe_search_idx' in queryset.explain()
+    assert queryset.count() == len(recipes)
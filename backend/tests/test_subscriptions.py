@@ -0,0 +1,53 @@
+import pytest
+from django.conf import settings
+
+from users.models import Follow
+
+SUBSCRIPTIONS_URL = '/api/users/subscriptions/'
+# Токен с пользователем, количество и страница авторов и превью
+# рецептов всех авторов страницы одним запросом.
+SUBSCRIPTIONS_QUERIES = 4
+
+
+@pytest.fixture
+def follows(user, authors, recipes):
+    for author in authors:
+        Follow.objects.create(user=user, author=author)
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('limit', (1, 3))
+def test_subscriptions_queries(
+    user_client, follows, django_assert_num_queries, limit,
+):
+    with django_assert_num_queries(SUBSCRIPTIONS_QUERIES):
+        response = user_client.get(
+            SUBSCRIPTIONS_URL, {'limit': limit, 'recipes_limit': 5},
+        )
+    assert response.status_code == 200
+    assert len(response.data['results']) == limit
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('recipes_limit, expected', (
+    ('2', 2),
+    ('0', 0),
+    ('-1', settings.RECIPES_LIMIT),
+    ('много', settings.RECIPES_LIMIT),
+))
+def test_subscriptions_recipes_limit(
+    user_client, follows, recipes, recipes_limit, expected,
+):
+    response = user_client.get(
+        SUBSCRIPTIONS_URL, {'limit': 3, 'recipes_limit': recipes_limit},
+    )
+    assert response.status_code == 200
+    for author in response.data['results']:
+        assert author['recipes_count'] == 20
+        assert [recipe['id'] for recipe in author['recipes']] == sorted(
+            (
+                recipe.id for recipe in recipes
+                if recipe.author.id == author['id']
+            ),
+            reverse=True,
+        )[:expected]
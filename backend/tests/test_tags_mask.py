@@ -0,0 +1,74 @@
+import pytest
+from django.db import connection
+
+from recipes.models import Recipe, Tag, get_tags_mask
+from tests.conftest import create_recipe
+
+
+@pytest.fixture
+def recipe(user, tags, ingredients):
+    return create_recipe(user, tags[:1], ingredients)
+
+
+def get_mask(recipe):
+    return Recipe.objects.values_list('tags_mask', flat=True).get(
+        pk=recipe.pk,
+    )
+
+
+@pytest.mark.django_db
+def test_update_sets_mask(user_client, recipe, tags, ingredients):
+    response = user_client.patch(f'/api/recipes/{recipe.id}/', {
+        'tags': [tags[1].id, tags[2].id],
+        'ingredients': [{'id': ingredients[0].id, 'amount': 10}],
+    }, format='json')
+    assert response.status_code == 200
+    assert get_mask(recipe) == get_tags_mask([tags[1].id, tags[2].id])
+
+
+@pytest.mark.django_db
+def test_tags_set_updates_mask_once(
+    recipe, tags, django_assert_max_num_queries,
+):
+    # Выборка и удаление связей, вставка и один пересчёт маски.
+    with django_assert_max_num_queries(5):
+        recipe.tags.set(tags)
+    assert get_mask(recipe) == get_tags_mask(tag.id for tag in tags)
+
+
+@pytest.mark.django_db
+def test_tag_delete_clears_mask_bit(recipe, tags):
+    recipe.tags.add(tags[1])
+    tags[0].delete()
+    assert get_mask(recipe) == get_tags_mask([tags[1].id])
+
+
+@pytest.mark.django_db
+def test_filter_any_tag(client, recipes, tags):
+    response = client.get(
+        '/api/recipes/', {'tags': [tags[0].slug], 'limit': 100},
+    )
+    assert response.status_code == 200
+    assert {recipe['id'] for recipe in response.data['results']} == {
+        recipe.id for recipe in recipes if tags[0] in recipe.tags.all()
+    }
+    response = client.get(
+        '/api/recipes/', {'tags': [tags[0].slug, tags[2].slug], 'limit': 100},
+    )
+    assert response.data['count'] == len(recipes)
+
+
+@pytest.mark.django_db
+def test_filter_any_tag_uses_gin_index(authors, ingredients):
+    if connection.vendor != 'postgresql':
+        pytest.skip('GIN-индекс tag_ids есть только в PostgreSQL.')
+    # Последовательность id тегов не сбрасывается между тестами, а в
+    # массив tag_ids попадают только теги с id до 63.
+    tag = Tag.objects.create(id=5, name='soup', color='#000005', slug='soup')
+    for author in authors:
+        create_recipe(author, [tag], ingredients)
+    queryset = Recipe.objects.with_any_tag([tag.id])
+    with connection.cursor() as cursor:
+        cursor.execute('SET LOCAL enable_seqscan = off')
+    assert 'recipes_recipe_tag_ids_idx' in queryset.explain()
+    assert queryset.count() == len(authors)
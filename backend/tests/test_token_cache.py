@@ -0,0 +1,48 @@
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+
+from api.authentication import get_token_cache_key
+
+
+def get_cached(user):
+    return cache.get(get_token_cache_key(Token.objects.get(user=user).key))
+
+
+def token_queries(client, path):
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(path)
+    assert response.status_code == 200
+    table = Token._meta.db_table
+    return [
+        query for query in context.captured_queries
+        if table in query['sql']
+    ]
+
+
+@pytest.mark.django_db
+def test_cached_token_in_shared_cache(settings, user_client, user):
+    settings.CACHE_SHARED = True
+    assert token_queries(user_client, '/api/tags/')
+    assert get_cached(user) == (user.id, True)
+    assert not token_queries(user_client, '/api/tags/')
+    response = user_client.get('/api/users/me/')
+    assert response.data['email'] == user.email
+
+
+@pytest.mark.django_db
+def test_logout_revokes_cached_token(settings, user_client):
+    settings.CACHE_SHARED = True
+    assert user_client.get('/api/users/me/').status_code == 200
+    assert user_client.post('/api/auth/token/logout/').status_code == 204
+    assert user_client.get('/api/users/me/').status_code == 401
+
+
+@pytest.mark.django_db
+def test_token_not_cached_without_shared_cache(settings, user_client, user):
+    settings.CACHE_SHARED = False
+    assert token_queries(user_client, '/api/tags/')
+    assert get_cached(user) is None
+    assert token_queries(user_client, '/api/tags/')
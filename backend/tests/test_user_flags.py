@@ -0,0 +1,90 @@
+import pytest
+from django.core.cache import cache
+
+from recipes.cache import (
+    FAVORITES,
+    get_user_flags,
+    get_version,
+    invalidate_user_flags,
+)
+from recipes.models import Favorite, ShoppingList
+from users.models import Follow
+
+
+@pytest.fixture
+def shared_cache(settings):
+    settings.CACHE_SHARED = True
+
+
+@pytest.mark.django_db
+def test_favorite_resets_cached_flags(
+    shared_cache, user_client, recipes, django_capture_on_commit_callbacks,
+):
+    recipe = recipes[0]
+    url = f'/api/recipes/{recipe.id}/'
+    assert not user_client.get(url).data['is_favorited']
+    with django_capture_on_commit_callbacks(execute=True):
+        response = user_client.post(f'{url}favorite/')
+    assert response.status_code == 201
+    assert user_client.get(url).data['is_favorited']
+    with django_capture_on_commit_callbacks(execute=True):
+        response = user_client.delete(f'{url}favorite/')
+    assert response.status_code == 204
+    assert not user_client.get(url).data['is_favorited']
+
+
+@pytest.mark.django_db
+def test_stale_flags_are_not_served(
+    shared_cache, user, recipes, django_capture_on_commit_callbacks,
+):
+    scope = f'user_flags:{user.id}'
+    stale_key = f'{scope}:{get_version(scope)}'
+    stale_flags = get_user_flags(user.id)
+    with django_capture_on_commit_callbacks(execute=True):
+        Favorite.objects.create(user=user, recipe=recipes[0])
+        invalidate_user_flags(user.id)
+    # Запрос, прочитавший базу до фиксации, кладёт отметки позже неё.
+    cache.set(stale_key, stale_flags)
+    assert recipes[0].id in get_user_flags(user.id)[FAVORITES]
+
+
+@pytest.mark.django_db
+def test_flags_are_not_cached_without_shared_cache(
+    settings, user, recipes, django_assert_num_queries,
+):
+    settings.CACHE_SHARED = False
+    get_user_flags(user.id)
+    Favorite.objects.create(user=user, recipe=recipes[0])
+    with django_assert_num_queries(1):
+        assert recipes[0].id in get_user_flags(user.id)[FAVORITES]
+
+
+@pytest.mark.django_db
+def test_admin_changes_reset_cached_flags(
+    shared_cache, admin_client, user, user_client, authors, recipes,
+    django_capture_on_commit_callbacks,
+):
+    recipe = recipes[0]
+    favorite = Favorite.objects.create(user=user, recipe=recipe)
+    follow = Follow.objects.create(user=user, author=recipe.author)
+    url = f'/api/recipes/{recipe.id}/'
+    data = user_client.get(url).data
+    assert data['is_favorited'] and data['author']['is_subscribed']
+    assert not data['is_in_shopping_cart']
+    with django_capture_on_commit_callbacks(execute=True):
+        admin_client.post('/admin/recipes/shoppinglist/add/', {
+            'user': user.id, 'recipe': recipe.id,
+        })
+        admin_client.post('/admin/recipes/favorite/', {
+            'action': 'delete_selected',
+            '_selected_action': [favorite.id],
+            'post': 'yes',
+        })
+        admin_client.post(
+            f'/admin/users/follow/{follow.id}/delete/', {'post': 'yes'},
+        )
+    assert ShoppingList.objects.filter(user=user).exists()
+    assert not Favorite.objects.exists() and not Follow.objects.exists()
+    data = user_client.get(url).data
+    assert data['is_in_shopping_cart']
+    assert not data['is_favorited'] and not data['author']['is_subscribed']
@@ -1,5 +1,7 @@
 from django.contrib import admin
 
+from recipes.cache import invalidate_user_flags
+from recipes.feed import backfill_feed, trim_feed
 from users.models import Follow, User
 
 
@@ -13,10 +15,12 @@ class UserAdmin(admin.ModelAdmin):
         'email',
         'first_name',
         'last_name',
+        'recipes_count',
         'password',
     )
-    list_filter = ('username', 'email')
+    list_filter = ('is_staff', 'is_active')
     search_fields = ('username', 'email')
+    show_full_result_count = False
     empty_value_display = '<пусто>'
 
 
@@ -25,5 +29,32 @@ class FollowAdmin(admin.ModelAdmin):
     """Администрирование подписок."""
 
     list_display = ('id', 'user', 'author')
-    list_filter = ('user', 'author')
+    list_select_related = ('user', 'author')
+    search_fields = ('user__username', 'author__username')
+    autocomplete_fields = ('user', 'author')
+    show_full_result_count = False
     empty_value_display = '<пусто>'
+
+    def save_model(self, request, obj, form, change):
+        old = (form.initial.get('user'), form.initial.get('author'))
+        super().save_model(request, obj, form, change)
+        if change and old == (obj.user_id, obj.author_id):
+            return
+        if change:
+            trim_feed(*old)
+            invalidate_user_flags(old[0])
+        backfill_feed(obj.user_id, obj.author_id)
+        invalidate_user_flags(obj.user_id)
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        trim_feed(obj.user_id, obj.author_id)
+        invalidate_user_flags(obj.user_id)
+
+    def delete_queryset(self, request, queryset):
+        follows = list(queryset.values_list('user_id', 'author_id'))
+        super().delete_queryset(request, queryset)
+        for user_id, author_id in follows:
+            trim_feed(user_id, author_id)
+        for user_id in {user_id for user_id, _ in follows}:
+            invalidate_user_flags(user_id)
@@ -10,6 +10,11 @@ class User(AbstractUser):
         unique=True,
         verbose_name='Электронная почта',
     )
+    recipes_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Количество рецептов',
+    )
 
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['username', 'first_name', 'last_name']
@@ -22,6 +27,16 @@ class User(AbstractUser):
     def __str__(self):
         return self.email
 
+    def refresh_from_db(self, using=None, fields=None):
+        """Отложенные поля загружаются все одним запросом: пользователь
+        из кэша токенов (api/authentication.py) содержит только id и
+        is_active."""
+        if fields is not None:
+            deferred_fields = self.get_deferred_fields()
+            if deferred_fields.intersection(fields):
+                fields = deferred_fields.union(fields)
+        super().refresh_from_db(using, fields)
+
 
 class Follow(models.Model):
     """Модель подписок."""